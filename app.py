@@ -42,7 +42,7 @@ def initialize_system():
     processor = PDFProcessor()
     workflow = BJJRuleWorkflow(qdrant_manager)
     
-    if not qdrant_manager.vectorstore:
+    if not qdrant_manager.ready:
         # Process PDFs and create vectorstore
         with st.status("Initializing CornerGuide...", expanded=True) as status:
             status_text = st.empty()
@@ -50,23 +50,23 @@ def initialize_system():
             def update_status(message):
                 status_text.text(f"📄 {message}")
             
-            # Process PDFs with status updates
-            chunks = processor.process_all_pdfs(status_callback=update_status)
-            
-            if chunks:
-                status_text.text("🔗 Creating vector database...")
-                # Create in-memory vectorstore
-                success = qdrant_manager.create_from_chunks(chunks)
-                
-                if success:
-                    status_text.text(f"✅ Ready with {len(chunks)} rule chunks!")
-                    status.update(label="✅ CornerGuide Ready!", state="complete")
-                else:
-                    status_text.text("❌ Failed to create vectorstore")
-                    status.update(label="❌ Initialization Failed", state="error")
-            else:
+            # Check for rulebooks before building, so an empty assets folder is not reported as a failed build
+            if not processor.scan_assets():
                 status_text.text("⚠️ No rule documents found")
                 status.update(label="⚠️ No Documents Found", state="error")
+                return workflow, qdrant_manager
+            
+            # Reuse the persisted index when its manifest still matches the assets
+            status_text.text("🔗 Loading vector database...")
+            success = qdrant_manager.load_or_build(processor, status_callback=update_status)
+            chunk_count = qdrant_manager.chunk_count
+            
+            if success:
+                status_text.text(f"✅ Ready with {chunk_count} rule chunks!")
+                status.update(label="✅ CornerGuide Ready!", state="complete")
+            else:
+                status_text.text("❌ Failed to create vectorstore")
+                status.update(label="❌ Initialization Failed", state="error")
     
     return workflow, qdrant_manager
 
@@ -124,9 +124,10 @@ def main():
                 st.warning("Please enter a question.")
     
     # Footer with database status
-    if qdrant_manager.vectorstore:
+    if qdrant_manager.ready:
         st.markdown("---")
-        st.markdown(f"<p style='text-align: center; color: #999; font-size: 0.8em;'>Database: In-memory vectorstore ready</p>", unsafe_allow_html=True)
+        storage = "Persistent" if qdrant_manager.index_dir else "In-memory"
+        st.markdown(f"<p style='text-align: center; color: #999; font-size: 0.8em;'>Database: {storage} vectorstore ready</p>", unsafe_allow_html=True)
 
 def get_answer(question: str, federation: str, workflow: BJJRuleWorkflow):
     """Process the question and display the answer."""
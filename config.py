@@ -16,16 +16,59 @@ LANGSMITH_TRACING = True
 
 # Model Configuration
 EMBEDDING_MODEL = "text-embedding-3-large"
+# "full" keeps every embedding dimension in the index; "shortlist" searches a truncated
+# (Matryoshka) and optionally int8-quantized copy with the NumPy backend, then rescores
+# the top candidates against full-precision vectors kept on disk
+EMBEDDING_INDEX_MODE = os.getenv("CORNERGUIDE_EMBEDDING_INDEX_MODE", "full")
+SHORTLIST_DIMENSIONS = 256
+SHORTLIST_INT8 = True
+RESCORE_CANDIDATES = 50
 LLM_MODEL = "gpt-4o"
 
 # Vector Database Configuration  
 COLLECTION_NAME = "bjj_rules"
+# Optional Qdrant server; when unset the collection lives in the local qdrant-client engine
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 # Retrieval Configuration
 TOP_K_RETRIEVAL = 5
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 160
 RERANK_TOP_K = 20
+# "dense" embeds queries, "fast" uses only the local BM25 index, "hybrid" fuses both by reciprocal rank
+RETRIEVAL_MODE = os.getenv("CORNERGUIDE_RETRIEVAL_MODE", "dense")
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Reciprocal rank fusion constant, shared by hybrid search and fusion-query merging
+RRF_K = 60
+# RRF weight of the original question relative to its reformulations (1.0 weighs them equally)
+ORIGINAL_QUERY_WEIGHT = 1.0
+
+# Rerank Policy Configuration
+# Skip Cohere, or rerank only a short head, when dense results are decisive (dense mode only)
+RERANK_POLICY_ENABLED = True
+# Cosine gap between the original question's top-1 and top-k hits
+RERANK_SKIP_MARGIN = float(os.getenv("CORNERGUIDE_RERANK_SKIP_MARGIN", "0.12"))
+RERANK_HEAD_MARGIN = float(os.getenv("CORNERGUIDE_RERANK_HEAD_MARGIN", "0.06"))
+# Share of fusion queries whose top hit must be the fused top chunk
+RERANK_SKIP_AGREEMENT = 1.0
+RERANK_HEAD_SIZE = 8
+
+# Rerank Cache Configuration
+# Reuse Cohere relevance scores per (query, chunk_id) until the index version changes
+RERANK_MODEL = "rerank-english-v3.0"
+RERANK_CACHE_ENABLED = True
+# Scores cached under other index versions are removed once no process has used them for this long
+RERANK_CACHE_MAX_AGE_DAYS = float(os.getenv("CORNERGUIDE_RERANK_CACHE_MAX_AGE_DAYS", "7"))
+# Search the original question while fusion queries are still being generated. This hides the
+# LLM round trip but does not save its cost: a skipped LLM call has usually already been sent
+SPECULATIVE_RETRIEVAL = True
+# Cosine score of the original query's top hit above which reformulations are not waited for
+SPECULATIVE_CONFIDENCE = float(os.getenv("CORNERGUIDE_SPECULATIVE_CONFIDENCE", "0.62"))
+# Reuse stored LLM reformulations, and expand known BJJ terms locally before calling the LLM
+REFORMULATION_CACHE_ENABLED = True
+THESAURUS_EXPANSION_ENABLED = True
 
 # Data Paths
 ASSETS_DIR = "assets"
@@ -36,4 +79,72 @@ PDF_FILES = [
     "IBJJF_Legal_Techniques.pdf",
     "ADCC_Weight_Classes_Divisions_Categories.pdf",
     "IBJJF_RULES_UPDATE_GUIDE.pdf"
-]
\ No newline at end of file
+]
+
+# Ingest Cache Configuration
+CACHE_DIR = os.getenv("CORNERGUIDE_CACHE_DIR", ".cache")
+CHUNK_CACHE_ENABLED = True
+# Bump whenever extraction or chunking logic changes so stale cached chunks are ignored
+EXTRACTOR_VERSION = "2"
+
+# Parallel Ingest Configuration
+# Number of worker processes used to extract PDFs; 1 keeps ingest serial
+INGEST_WORKERS = int(os.getenv("CORNERGUIDE_INGEST_WORKERS", "1"))
+# Worker processes used to extract page ranges of a single PDF; 1 disables sharding
+EXTRACTION_SHARD_WORKERS = int(os.getenv("CORNERGUIDE_SHARD_WORKERS", "1"))
+PAGES_PER_SHARD = 25
+
+# Table Routing Configuration
+# Route only table-like pages of structured PDFs through hi_res partitioning
+TABLE_ROUTING_ENABLED = True
+TABLE_MIN_RULING_OPS = 100
+TABLE_COLUMNAR_LINE_RATIO = 0.3
+
+# Streaming Ingest Configuration
+# Embed and upsert chunks in batches while PDFs are still being extracted
+STREAMING_INGEST = True
+STREAM_BATCH_SIZE = 64
+STREAM_QUEUE_SIZE = 4
+
+# Near-Duplicate Chunk Configuration
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.85
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 16
+
+# Memory-Bounded Extraction Configuration
+# Extract and split page by page instead of building whole-document strings
+MEMORY_BOUNDED_EXTRACTION = True
+
+# Persistent Index Configuration
+# Keep the embedded collection on disk and reuse it while its manifest matches.
+# A local Qdrant index (VECTOR_BACKEND "qdrant" without QDRANT_URL) is locked by the process
+# that opens it, so only one process at a time can serve it; NumPy indexes have no such limit
+PERSIST_INDEX = True
+INDEX_DIR = os.getenv("CORNERGUIDE_INDEX_DIR", os.path.join(CACHE_DIR, "index"))
+
+# Embedding Cache Configuration
+# Reuse stored vectors for texts already embedded with the same model
+EMBEDDING_CACHE_ENABLED = True
+
+# Query Embedding Cache Configuration
+# In-process LRU of query vectors keyed by normalised query text and embedding model
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_SIZE = 2048
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("CORNERGUIDE_QUERY_CACHE_TTL", "3600"))
+
+# Embedding Scheduler Configuration
+# Token-budgeted batches embedded concurrently under the account's tokens-per-minute limit
+EMBED_BATCH_TOKENS = 20000
+EMBED_CONCURRENCY = 4
+EMBED_TOKENS_PER_MINUTE = int(os.getenv("CORNERGUIDE_EMBED_TPM", "1000000"))
+EMBED_MAX_RETRIES = 6
+
+# Vector Backend Configuration
+# "qdrant" uses the qdrant-client local engine; "numpy" does exact search over one in-memory matrix.
+# Defaults to NumPy unless a Qdrant server is configured, so several processes can open the same index
+VECTOR_BACKEND = os.getenv("CORNERGUIDE_VECTOR_BACKEND", "qdrant" if QDRANT_URL else "numpy")
+
+# Federation Sharding Configuration
+# Keep one collection per federation; "All" searches fan out to every shard and merge with equal quotas
+FEDERATION_SHARDING = os.getenv("CORNERGUIDE_FEDERATION_SHARDING", "1") == "1"
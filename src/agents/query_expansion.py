@@ -0,0 +1,97 @@
+import re
+from typing import List, Tuple
+
+# Interchangeable BJJ rule terms, curated offline from the IBJJF and ADCC rulebooks and common
+# athlete phrasing. The first term of each group is the rulebook wording. Every member of a group
+# must be a true synonym in the same grammatical form, so it can replace any other member in place:
+# narrower or broader terms (a heel hook is not an outside heel hook, a throw is only one kind of
+# takedown) and verb/noun pairs (pull guard, guard pull) do not belong together.
+BJJ_THESAURUS: List[List[str]] = [
+    ["juvenile", "16-17 year old"],
+    ["kids", "children"],
+    ["master", "veteran"],
+    ["leg lock", "lower body submission"],
+    ["straight ankle lock", "straight footlock", "achilles lock"],
+    ["knee reaping", "reaping"],
+    ["knee bar", "kneebar"],
+    ["toe hold", "toehold"],
+    ["calf slicer", "calf crusher"],
+    ["wrist lock", "wristlock", "wrist submission"],
+    ["neck crank", "cervical lock"],
+    ["gi pants", "gi trousers"],
+    ["gi", "kimono"],
+    ["no-gi", "nogi", "submission grappling"],
+    ["rash guard", "rashguard", "compression shirt"],
+    ["belt level", "belt rank"],
+    ["takedown", "take down"],
+    ["guard passing", "passing the guard"],
+    ["mount", "full mount", "mounted position"],
+    ["back control", "back mount"],
+    ["knee on belly", "knee on stomach", "knee ride"],
+    ["advantage", "advantage point"],
+    ["foul", "infraction"],
+    ["disqualification", "dq"],
+    ["stalling", "lack of combativeness", "passivity"],
+    ["time limit", "match duration", "match length"],
+    ["overtime", "extra time"],
+    ["regulation time", "regulation period", "main time"],
+    ["scoring", "point system"],
+    ["negative points", "point deduction", "minus points"],
+    ["collar grip", "lapel grip", "collar hold"],
+    ["referee", "ref"],
+    ["weight class", "weight division", "weight category"],
+    ["absolute", "open weight", "open class"],
+]
+
+class ThesaurusExpander:
+    """Builds deterministic query variants by swapping BJJ terms for their thesaurus synonyms.
+
+    Matches are found longest-term first so "straight ankle lock" is never rewritten as a plain
+    "ankle lock". A plural "s"/"es" is matched along with its term and re-applied to the
+    synonym. Variant n replaces every matched term with the n-th other member of its group.
+    """
+
+    def __init__(self, groups: List[List[str]] = None):
+        self.groups = groups or BJJ_THESAURUS
+        terms = sorted(
+            ((term, index) for index, group in enumerate(self.groups) for term in group),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self.group_of = {term: index for term, index in terms}
+        self.pattern = re.compile(
+            r"(?<![\w-])(" + "|".join(re.escape(term) for term, _ in terms) + r")(e?s)?(?![\w-])",
+            re.IGNORECASE
+        )
+
+    @staticmethod
+    def _pluralise(term: str) -> str:
+        return term + "es" if re.search(r"(s|x|z|ch|sh)$", term) else term + "s"
+
+    def _matches(self, question: str) -> List[Tuple[int, int, str, bool]]:
+        return [
+            (match.start(), match.end(), match.group(1).lower(), bool(match.group(2)))
+            for match in self.pattern.finditer(question)
+        ]
+
+    def expand(self, question: str, variants: int = 2) -> List[str]:
+        """Return up to `variants` rewrites of the question; empty when no thesaurus term occurs."""
+        matches = self._matches(question)
+        if not matches:
+            return []
+
+        rewrites = []
+        for n in range(variants):
+            parts = []
+            position = 0
+            for start, end, term, plural in matches:
+                alternatives = [alt for alt in self.groups[self.group_of[term]] if alt != term]
+                replacement = alternatives[n % len(alternatives)]
+                parts.append(question[position:start])
+                parts.append(self._pluralise(replacement) if plural else replacement)
+                position = end
+            parts.append(question[position:])
+            rewrite = "".join(parts)
+            if rewrite != question and rewrite not in rewrites:
+                rewrites.append(rewrite)
+        return rewrites
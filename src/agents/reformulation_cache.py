@@ -0,0 +1,52 @@
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+from config import CACHE_DIR
+
+class ReformulationCache:
+    """Persistent cache of LLM query reformulations keyed by normalised question.
+
+    The key also covers the model and the prompt template, so editing either one starts a
+    fresh set of entries. Everything lives in one reformulations.json file, which is rewritten
+    through a temp file after each new entry.
+    """
+
+    def __init__(self, model: str, template: str, cache_dir: str = None):
+        self.cache_path = Path(cache_dir or CACHE_DIR) / "reformulations.json"
+        self.namespace = hashlib.sha256(f"{model}|{template}".encode("utf-8")).hexdigest()[:16]
+        self.lock = threading.Lock()
+        self.entries: Dict[str, List[str]] = self._load()
+
+    def _load(self) -> Dict[str, List[str]]:
+        if not self.cache_path.exists():
+            return {}
+        try:
+            return json.loads(self.cache_path.read_text())
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable reformulation cache: {e}")
+            return {}
+
+    @staticmethod
+    def normalise(question: str) -> str:
+        return re.sub(r"\s+", " ", question).strip().casefold()
+
+    def _key(self, question: str) -> str:
+        return f"{self.namespace}:{self.normalise(question)}"
+
+    def get(self, question: str) -> Optional[List[str]]:
+        with self.lock:
+            return self.entries.get(self._key(question))
+
+    def put(self, question: str, reformulations: List[str]):
+        with self.lock:
+            self.entries[self._key(question)] = reformulations
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self.entries, indent=1))
+                tmp_path.replace(self.cache_path)
+            except Exception as e:
+                print(f"Warning: Failed to write reformulation cache: {e}")
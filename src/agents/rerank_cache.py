@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+from config import CACHE_DIR, RERANK_MODEL, RERANK_CACHE_MAX_AGE_DAYS
+
+# How often a long-running process re-marks its index version as in use
+_TOUCH_INTERVAL_SECONDS = 3600
+
+class RerankCache:
+    """On-disk cache of rerank relevance scores per (query, chunk_id).
+
+    Scores are deterministic for a model, query and document, so they are stored per query
+    under a directory for the current index version, and chunk IDs under another version are
+    never consulted. Several processes may serve different index versions from one cache (an
+    app and an evaluator, say), so a version directory is only removed once no process has used
+    it for max_age_days; each process marks its own version as used while it runs.
+    """
+
+    def __init__(self, model: str = RERANK_MODEL, cache_dir: str = None,
+                 max_age_days: float = RERANK_CACHE_MAX_AGE_DAYS):
+        namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self.cache_dir = Path(cache_dir or CACHE_DIR) / "rerank" / namespace
+        self.max_age_seconds = max_age_days * 86400
+        self.active_version = None
+        self.touched_at = 0.0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalise(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip().casefold()
+
+    def _version_dir(self, index_version: str) -> Path:
+        return self.cache_dir / index_version[:16]
+
+    def _entry_path(self, index_version: str, query: str) -> Path:
+        key = hashlib.sha256(self.normalise(query).encode("utf-8")).hexdigest()
+        return self._version_dir(index_version) / f"{key}.json"
+
+    def _activate(self, index_version: str):
+        now = time.time()
+        if index_version == self.active_version and now - self.touched_at < _TOUCH_INTERVAL_SECONDS:
+            return
+        self.active_version = index_version
+        self.touched_at = now
+        current = self._version_dir(index_version)
+        try:
+            current.mkdir(parents=True, exist_ok=True)
+            # The directory's mtime records when any process last used this version
+            os.utime(current)
+            for stale in self.cache_dir.iterdir():
+                if stale.is_dir() and stale != current and now - stale.stat().st_mtime > self.max_age_seconds:
+                    shutil.rmtree(stale, ignore_errors=True)
+        except OSError as e:
+            print(f"Warning: Failed to maintain rerank cache versions: {e}")
+
+    def _read(self, entry_path: Path) -> Dict[str, float]:
+        if not entry_path.exists():
+            return {}
+        try:
+            return json.loads(entry_path.read_text())["scores"]
+        except Exception as e:
+            print(f"Warning: Discarding unreadable rerank cache entry {entry_path.name}: {e}")
+            entry_path.unlink(missing_ok=True)
+            return {}
+
+    def get(self, index_version: str, query: str, chunk_ids: List[str]) -> Dict[str, float]:
+        """Return cached scores for whichever of `chunk_ids` have one."""
+        with self.lock:
+            self._activate(index_version)
+            stored = self._read(self._entry_path(index_version, query))
+            found = {chunk_id: stored[chunk_id] for chunk_id in chunk_ids if chunk_id in stored}
+            self.hits += len(found)
+            self.misses += len(set(chunk_ids)) - len(found)
+            return found
+
+    def put(self, index_version: str, query: str, scores: Dict[str, float]):
+        with self.lock:
+            self._activate(index_version)
+            entry_path = self._entry_path(index_version, query)
+            try:
+                entry_path.parent.mkdir(parents=True, exist_ok=True)
+                merged = {**self._read(entry_path), **scores}
+                # Write to a temp file first so a crash never leaves a truncated entry behind
+                tmp_path = entry_path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps({"query": self.normalise(query), "scores": merged}))
+                tmp_path.replace(entry_path)
+            except Exception as e:
+                print(f"Warning: Failed to write rerank cache entry: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Rerank cache: {stats['hits']} cached scores, {stats['misses']} sent to the reranker "
+              f"({stats['hit_rate']:.1%} hit rate)")
@@ -0,0 +1,89 @@
+import re
+from typing import List, Dict, Any, Tuple
+from config import (
+    TOP_K_RETRIEVAL, RERANK_TOP_K, RERANK_SKIP_MARGIN, RERANK_HEAD_MARGIN, RERANK_SKIP_AGREEMENT,
+    RERANK_HEAD_SIZE
+)
+from src.models.rules import RuleChunk
+
+class RerankPolicy:
+    """Decides how much of the fused candidate list is worth sending to the Cohere reranker.
+
+    Two signals from the dense results are used. The margin is the cosine gap between the
+    original question's top hit and its top-k hit. The agreement is the share of reformulations
+    whose own top hit is the fused top chunk. It only counts reformulations that differ from the
+    question by more than case, spacing or hyphens, and it is 0 with fewer than two of them, so a
+    question searched alone (or next to spelling variants of itself) never agrees with itself. A
+    large margin with full agreement skips reranking, a moderate margin or full agreement
+    reranks only a short head, and anything else reranks every candidate.
+    """
+
+    def __init__(self, skip_margin: float = RERANK_SKIP_MARGIN, head_margin: float = RERANK_HEAD_MARGIN,
+                 skip_agreement: float = RERANK_SKIP_AGREEMENT, head_size: int = RERANK_HEAD_SIZE,
+                 top_k: int = TOP_K_RETRIEVAL):
+        self.skip_margin = skip_margin
+        self.head_margin = head_margin
+        self.skip_agreement = skip_agreement
+        self.head_size = max(head_size, top_k)
+        self.top_k = top_k
+        self.decisions = {"skip": 0, "head": 0, "full": 0}
+        self.documents_reranked = 0
+
+    @staticmethod
+    def _normalise(query: str) -> str:
+        return re.sub(r"[\s-]", "", query).casefold()
+
+    def signals(self, raw_results: List[RuleChunk], fused: List[RuleChunk], chunk_key,
+                question: str) -> Tuple[float, float]:
+        ranked_lists: Dict[str, List[RuleChunk]] = {}
+        for result in raw_results:
+            ranked_lists.setdefault(result.query_used, []).append(result)
+        original = ranked_lists.get(question)
+        if not original or not fused:
+            return 0.0, 0.0
+
+        # Scores of the original question's results are comparable with each other
+        scores = [result.retrieval_score or 0 for result in original]
+        margin = scores[0] - scores[min(self.top_k, len(scores)) - 1]
+
+        reformulations = [
+            results for query, results in ranked_lists.items()
+            if self._normalise(query) != self._normalise(question)
+        ]
+        if len(reformulations) < 2:
+            return margin, 0.0
+        top_key = chunk_key(fused[0])
+        agreement = sum(chunk_key(results[0]) == top_key for results in reformulations) / len(reformulations)
+        return margin, agreement
+
+    def decide(self, raw_results: List[RuleChunk], fused: List[RuleChunk], chunk_key, question: str) -> int:
+        """Return how many leading candidates to rerank: 0 skips the reranker."""
+        margin, agreement = self.signals(raw_results, fused, chunk_key, question)
+        if margin >= self.skip_margin and agreement >= self.skip_agreement:
+            decision, size = "skip", 0
+        elif margin >= self.head_margin or agreement >= self.skip_agreement:
+            decision, size = "head", min(self.head_size, RERANK_TOP_K)
+        else:
+            decision, size = "full", RERANK_TOP_K
+
+        self.decisions[decision] += 1
+        self.documents_reranked += min(size, len(fused))
+        stats = self.stats()
+        print(f"Rerank policy: {decision} (margin {margin:.3f}, agreement {agreement:.2f}); "
+              f"skip rate {stats['skip_rate']:.1%} over {stats['requests']} requests")
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        requests = sum(self.decisions.values())
+        return {
+            "requests": requests,
+            **self.decisions,
+            "skip_rate": self.decisions["skip"] / requests if requests else 0.0,
+            "head_rate": self.decisions["head"] / requests if requests else 0.0,
+            "avg_documents_reranked": self.documents_reranked / requests if requests else 0.0
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Rerank policy: {stats['requests']} requests, {stats['skip_rate']:.1%} skipped, "
+              f"{stats['head_rate']:.1%} head only, {stats['avg_documents_reranked']:.1f} documents reranked per request")
@@ -1,17 +1,29 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 import cohere
 
-from config import LLM_MODEL, TOP_K_RETRIEVAL, RERANK_TOP_K, COHERE_API_KEY
+from config import (
+    LLM_MODEL, TOP_K_RETRIEVAL, RERANK_TOP_K, COHERE_API_KEY, RETRIEVAL_MODE, SPECULATIVE_RETRIEVAL,
+    SPECULATIVE_CONFIDENCE, REFORMULATION_CACHE_ENABLED, THESAURUS_EXPANSION_ENABLED, ORIGINAL_QUERY_WEIGHT,
+    RERANK_POLICY_ENABLED, RERANK_MODEL, RERANK_CACHE_ENABLED
+)
 from src.models.rules import RuleChunk
+from src.vector_db.rank_fusion import reciprocal_rank_fusion
+from .query_expansion import ThesaurusExpander
+from .reformulation_cache import ReformulationCache
+from .rerank_policy import RerankPolicy
+from .rerank_cache import RerankCache
 
 class BJJQueryVariations(BaseModel):
     reformulation_1: str
     reformulation_2: str
 
+LLM_REFORMULATIONS = len(BJJQueryVariations.model_fields)
+
 QUERY_GENERATION_TEMPLATE = """
 You are a BJJ rules expert. Generate 2 focused search queries that rephrase the original question using different BJJ terminology while maintaining the same intent.
 
@@ -28,9 +40,25 @@ Keep queries concise, rule-focused, and directly related to the original questio
 """
 
 class RetrievalAgent:
-    def __init__(self, qdrant_manager=None):
+    def __init__(self, qdrant_manager=None, retrieval_mode: str = RETRIEVAL_MODE):
         self.llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
         self.qdrant_manager = qdrant_manager
+        self.retrieval_mode = retrieval_mode
+        self.speculative = SPECULATIVE_RETRIEVAL
+        self.confidence_threshold = SPECULATIVE_CONFIDENCE
+        # Runs LLM reformulation off the request thread; a skipped result is simply never awaited
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="fusion-queries")
+        self.speculative_requests = 0
+        self.speculative_skips = 0
+        self.speculative_paid_skips = 0
+        
+        self.reformulation_cache = (
+            ReformulationCache(LLM_MODEL, QUERY_GENERATION_TEMPLATE) if REFORMULATION_CACHE_ENABLED else None
+        )
+        self.expander = ThesaurusExpander() if THESAURUS_EXPANSION_ENABLED else None
+        self.reformulation_counts = {"cache": 0, "thesaurus": 0, "llm": 0, "failed": 0}
+        self.rerank_policy = RerankPolicy() if RERANK_POLICY_ENABLED else None
+        self.rerank_cache = RerankCache() if RERANK_CACHE_ENABLED else None
         self.parser = PydanticOutputParser(pydantic_object=BJJQueryVariations)
         self.query_generation_prompt = ChatPromptTemplate.from_template(QUERY_GENERATION_TEMPLATE)
         
@@ -40,9 +68,41 @@ class RetrievalAgent:
             self.cohere_client = None
     
     
+    @staticmethod
+    def _unique_queries(queries: List[str]) -> List[str]:
+        unique_queries = []
+        for query in queries:
+            if query and query.strip() and query not in unique_queries:
+                if len(query.split()) > 2:  # Keep more similar queries
+                    unique_queries.append(query.strip())
+        return unique_queries
+    
     def generate_fusion_queries(self, refined_question: Dict[str, Any]) -> List[str]:
+        """Original question plus reformulations, taken from the cache, the thesaurus or the LLM, in that order."""
         question = refined_question["refined_question"]
+        reformulations = self._stored_reformulations(question)
+        if reformulations is None:
+            reformulations = self._llm_reformulations(question)
+        return [question] + reformulations
+    
+    def _stored_reformulations(self, question: str) -> Optional[List[str]]:
+        """Reformulations that cost no LLM call, or None when only the LLM can provide them."""
+        if self.reformulation_cache:
+            cached = self.reformulation_cache.get(question)
+            if cached is not None:
+                self.reformulation_counts["cache"] += 1
+                return cached
         
+        if self.expander:
+            # The thesaurus stands in for the LLM only when it can offer as many distinct rewrites
+            variants = self._unique_queries(self.expander.expand(question, LLM_REFORMULATIONS))
+            if len(variants) >= LLM_REFORMULATIONS:
+                self.reformulation_counts["thesaurus"] += 1
+                return variants
+        return None
+    
+    def _llm_reformulations(self, question: str) -> List[str]:
+        self.reformulation_counts["llm"] += 1
         try:
             response = (
                 self.query_generation_prompt 
@@ -58,19 +118,35 @@ class RetrievalAgent:
                 response.reformulation_2,
             ]
             
-            unique_queries = []
-            for query in queries:
-                if query and query.strip() and query not in unique_queries:
-                    if len(query.split()) > 2:  # Keep more similar queries
-                        unique_queries.append(query.strip())
+            unique_queries = self._unique_queries(queries)
+            if self.reformulation_cache:
+                self.reformulation_cache.put(question, unique_queries)
             
-            return [question] + unique_queries
+            return unique_queries
         except Exception as e:
             print(f"Failed to generate query variations: {e}")
-            return [question]
+            self.reformulation_counts["failed"] += 1
+            return []
+    
+    def reformulation_stats(self) -> Dict[str, Any]:
+        requests = sum(self.reformulation_counts[source] for source in ("cache", "thesaurus", "llm"))
+        rate = lambda count: count / requests if requests else 0.0
+        return {
+            "requests": requests,
+            **self.reformulation_counts,
+            "cache_hit_rate": rate(self.reformulation_counts["cache"]),
+            "thesaurus_rate": rate(self.reformulation_counts["thesaurus"]),
+            "llm_fallback_rate": rate(self.reformulation_counts["llm"])
+        }
+    
+    def report_reformulations(self):
+        stats = self.reformulation_stats()
+        print(f"Fusion queries: {stats['requests']} requests, {stats['cache_hit_rate']:.1%} from cache, "
+              f"{stats['thesaurus_rate']:.1%} from the thesaurus, {stats['llm_fallback_rate']:.1%} LLM fallbacks "
+              f"({stats['failed']} failed)")
     
     def retrieve_chunks(self, queries: List[str], federation_filter: str = None) -> List[RuleChunk]:
-        if not self.qdrant_manager or not self.qdrant_manager.vectorstore:
+        if not self.qdrant_manager or not self.qdrant_manager.ready:
             print("No vectorstore available")
             return []
         
@@ -78,14 +154,15 @@ class RetrievalAgent:
         # Get sufficient results per query to ensure good coverage for reranking
         results_per_query = 7
         
-        for query in queries:
-            # Get semantic search results only
-            semantic_results = self.qdrant_manager.search_similar(
-                query=query,
-                federation_filter=federation_filter,
-                limit=results_per_query
-            )
-            
+        # Embed all fusion queries together and search them in one batched request
+        batched_results = self.qdrant_manager.search_many(
+            queries,
+            federation_filter=federation_filter,
+            limit=results_per_query,
+            mode=self.retrieval_mode
+        )
+        
+        for query, semantic_results in zip(queries, batched_results):
             # Convert to RuleChunk objects
             for result in semantic_results:
                 rule_chunk = RuleChunk(
@@ -95,6 +172,7 @@ class RetrievalAgent:
                     belt_level=result.get("belt_level"),
                     technique=result.get("technique"),
                     source_page=result["metadata"].get("source_page"),
+                    metadata=result["metadata"],
                     retrieval_score=result["score"],
                     query_used=query
                 )
@@ -103,54 +181,134 @@ class RetrievalAgent:
         return all_results
     
     def retrieve(self, refined_question: Dict[str, Any], federation_filter: str = None) -> List[RuleChunk]:
-        queries = self.generate_fusion_queries(refined_question)
-        raw_results = self.retrieve_chunks(queries, federation_filter)
-        
-        unique_results = []
-        seen_content = set()
-        
-        raw_results.sort(key=lambda x: x.retrieval_score or 0, reverse=True)
-        # Remove restrictive score filtering - let reranker do the quality assessment
-        filtered_results = raw_results[:RERANK_TOP_K] if len(raw_results) > RERANK_TOP_K else raw_results
+        # Fast mode stays off the network: no LLM reformulations and no Cohere rerank
+        fast = self.retrieval_mode == "fast"
+        if fast:
+            raw_results = self.retrieve_chunks([refined_question["refined_question"]], federation_filter)
+        elif self.speculative:
+            raw_results = self._retrieve_speculative(refined_question, federation_filter)
+        else:
+            raw_results = self.retrieve_chunks(self.generate_fusion_queries(refined_question), federation_filter)
         
-        for result in filtered_results:
-            content_hash = hash(result.content)
-            if content_hash not in seen_content:
-                seen_content.add(content_hash)
-                unique_results.append(result)
+        # Deduplicate and fuse first, so every rerank slot goes to a distinct chunk
+        unique_results = self.fuse_results(raw_results, refined_question["refined_question"])
         
-        unique_results.sort(key=lambda x: x.retrieval_score or 0, reverse=True)
+        rerank_size = RERANK_TOP_K
+        # Only dense cosine scores give the policy a margin it can threshold
+        if self.rerank_policy and self.retrieval_mode == "dense" and self.cohere_client and unique_results:
+            rerank_size = self.rerank_policy.decide(
+                raw_results, unique_results, self.chunk_key, refined_question["refined_question"]
+            )
         
-        # Always apply Cohere reranking if available and we have enough results
-        if self.cohere_client and len(unique_results) > 0:
+        # Apply Cohere reranking if available, unless the policy found the dense ranking decisive
+        if self.cohere_client and len(unique_results) > 0 and not fast and rerank_size > 0:
             reranked_results = self._rerank_with_cohere(
                 refined_question["refined_question"], 
-                unique_results[:RERANK_TOP_K]
+                unique_results[:rerank_size]
             )
             if reranked_results:  # Check if reranking was successful
                 return reranked_results[:TOP_K_RETRIEVAL]
         
         return unique_results[:TOP_K_RETRIEVAL]
     
+    @staticmethod
+    def chunk_key(chunk: RuleChunk) -> str:
+        return (chunk.metadata or {}).get("chunk_id") or chunk.content
+    
+    @staticmethod
+    def fuse_results(results: List[RuleChunk], original_query: str = None,
+                     original_weight: float = ORIGINAL_QUERY_WEIGHT) -> List[RuleChunk]:
+        """Merge per-query result lists with reciprocal rank fusion, keyed on chunk ID.
+        
+        Similarity scores from different queries are not comparable, so only ranks are used.
+        Each chunk appears once, carrying its fused score in metadata["fusion_score"].
+        """
+        ranked_lists: Dict[str, List[RuleChunk]] = {}
+        for result in results:
+            ranked_lists.setdefault(result.query_used, []).append(result)
+        weights = [original_weight if query == original_query else 1.0 for query in ranked_lists]
+        
+        fused = reciprocal_rank_fusion(list(ranked_lists.values()), key=RetrievalAgent.chunk_key, weights=weights)
+        return [
+            chunk.model_copy(update={"metadata": {**(chunk.metadata or {}), "fusion_score": score}})
+            for chunk, score in fused
+        ]
+    
+    def _confident(self, results: List[RuleChunk]) -> bool:
+        # Only dense cosine scores are on a fixed scale that a threshold can be set against
+        if self.retrieval_mode != "dense" or len(results) < TOP_K_RETRIEVAL:
+            return False
+        return max(result.retrieval_score or 0 for result in results) >= self.confidence_threshold
+    
+    def _retrieve_speculative(self, refined_question: Dict[str, Any], federation_filter: str = None) -> List[RuleChunk]:
+        """Search the original question while the LLM writes reformulations, then search only those.
+        
+        Speculation saves latency, not cost. Reformulations already in the cache or the thesaurus
+        are searched together with the question without involving the LLM. Otherwise the LLM
+        call is submitted before the original search, so when that search turns out confident
+        the call has normally already started and is still paid for. Its result is then kept in
+        the reformulation cache for the next time the question is asked.
+        """
+        question = refined_question["refined_question"]
+        stored = self._stored_reformulations(question)
+        if stored is not None:
+            return self.retrieve_chunks([question] + [query for query in stored if query != question], federation_filter)
+        
+        self.speculative_requests += 1
+        pending_queries = self.executor.submit(self._llm_reformulations, question)
+        
+        original_results = self.retrieve_chunks([question], federation_filter)
+        if self._confident(original_results):
+            self.speculative_skips += 1
+            if not pending_queries.cancel():
+                self.speculative_paid_skips += 1
+            return original_results
+        
+        reformulations = [query for query in pending_queries.result() if query != question]
+        if not reformulations:
+            return original_results
+        return original_results + self.retrieve_chunks(reformulations, federation_filter)
+    
+    def speculation_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.speculative_requests,
+            "skipped_reformulations": self.speculative_skips,
+            # Skips whose LLM call had already started, so only its latency was saved
+            "paid_skips": self.speculative_paid_skips,
+            "skip_rate": self.speculative_skips / self.speculative_requests if self.speculative_requests else 0.0
+        }
+    
+    def report_speculation(self):
+        stats = self.speculation_stats()
+        print(f"Speculative retrieval: {stats['requests']} LLM reformulations started, "
+              f"{stats['skipped_reformulations']} skipped ({stats['skip_rate']:.1%}), "
+              f"{stats['paid_skips']} of them already paid for")
+    
     def _rerank_with_cohere(self, query: str, results: List[RuleChunk]) -> List[RuleChunk]:
-        """Rerank results using Cohere reranker."""
+        """Rerank results using Cohere reranker, sending only candidates without a cached score."""
         try:
-            documents = [result.content for result in results]
+            keys = [self.chunk_key(result) for result in results]
+            index_version = self.qdrant_manager.index_version if self.qdrant_manager else "unversioned"
+            scores = self.rerank_cache.get(index_version, query, keys) if self.rerank_cache else {}
             
-            response = self.cohere_client.rerank(
-                model="rerank-english-v3.0",
-                query=query,
-                documents=documents,
-                top_n=len(documents)
-            )
-            
-            reranked_results = []
-            for result in response.results:
-                original_chunk = results[result.index]
-                # Create new chunk with rerank score
-                updated_chunk = original_chunk.model_copy(update={"rerank_score": result.relevance_score})
-                reranked_results.append(updated_chunk)
+            missing = [i for i, key in enumerate(keys) if key not in scores]
+            if missing:
+                response = self.cohere_client.rerank(
+                    model=RERANK_MODEL,
+                    query=query,
+                    documents=[results[i].content for i in missing],
+                    top_n=len(missing)
+                )
+                fresh = {keys[missing[result.index]]: result.relevance_score for result in response.results}
+                scores.update(fresh)
+                if self.rerank_cache:
+                    self.rerank_cache.put(index_version, query, fresh)
             
+            # Create new chunks with rerank scores, best first
+            reranked_results = [
+                result.model_copy(update={"rerank_score": scores[key]}) for result, key in zip(results, keys)
+            ]
+            reranked_results.sort(key=lambda x: x.rerank_score, reverse=True)
             return reranked_results
         except Exception as e:
             print(f"Reranking failed: {e}")
@@ -0,0 +1,114 @@
+import argparse
+import time
+import tracemalloc
+import uuid
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any
+from langchain_core.documents import Document
+from src.vector_db.backends import VectorBackend, QdrantBackend, NumpyBackend
+
+FEDERATIONS = ["IBJJF", "ADCC"]
+CATEGORIES = ["scoring", "time_limits", "techniques", "penalties", "divisions", "general"]
+BELT_LEVELS = [None, "white", "blue", "purple", "brown", "black", "juvenile", "adult"]
+
+class BackendBenchmark:
+    """Compares exact NumPy search with the qdrant-client local engine on synthetic corpora."""
+
+    def __init__(self, dimensions: int = 3072, queries: int = 50, limit: int = 7, seed: int = 7):
+        self.dimensions = dimensions
+        self.queries = queries
+        self.limit = limit
+        self.rng = np.random.default_rng(seed)
+
+    def _corpus(self, size: int):
+        vectors = self.rng.standard_normal((size, self.dimensions), dtype=np.float32)
+        documents = [
+            Document(
+                page_content=f"Synthetic rule chunk {i}",
+                metadata={
+                    "federation": FEDERATIONS[i % len(FEDERATIONS)],
+                    "category": CATEGORIES[i % len(CATEGORIES)],
+                    "belt_level": BELT_LEVELS[i % len(BELT_LEVELS)],
+                    "source_file": f"synthetic_{i % 10}.pdf"
+                }
+            )
+            for i in range(size)
+        ]
+        ids = [str(uuid.UUID(int=i + 1)) for i in range(size)]
+        return ids, vectors, documents
+
+    def _build(self, backend: VectorBackend, ids, vectors, documents, batch_size: int = 1000) -> Dict[str, float]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        backend.create(self.dimensions)
+        for i in range(0, len(ids), batch_size):
+            backend.upsert(ids[i:i + batch_size], vectors[i:i + batch_size], documents[i:i + batch_size])
+        seconds = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"build_seconds": seconds, "resident_mb": current / 1e6, "peak_mb": peak / 1e6}
+
+    def _query_ms(self, backend: VectorBackend, queries: np.ndarray, filter_dict=None) -> float:
+        start = time.perf_counter()
+        for query in queries:
+            backend.search([query], filter_dict, self.limit)
+        return (time.perf_counter() - start) / len(queries) * 1e3
+
+    def _overlap(self, qdrant: VectorBackend, numpy_backend: VectorBackend, queries: np.ndarray) -> float:
+        qdrant_results = qdrant.search(list(queries), None, self.limit)
+        numpy_results = numpy_backend.search(list(queries), None, self.limit)
+        overlaps = [
+            len({doc.page_content for doc, _ in a} & {doc.page_content for doc, _ in b}) / self.limit
+            for a, b in zip(qdrant_results, numpy_results)
+        ]
+        return float(np.mean(overlaps))
+
+    def compare(self, size: int) -> List[Dict[str, Any]]:
+        print(f"Benchmarking {size} chunks at {self.dimensions} dimensions...")
+        ids, vectors, documents = self._corpus(size)
+        queries = self.rng.standard_normal((self.queries, self.dimensions), dtype=np.float32)
+
+        backends = {
+            "qdrant": QdrantBackend(),
+            "numpy": NumpyBackend()
+        }
+        rows = []
+        for name, backend in backends.items():
+            build = self._build(backend, ids, vectors, documents)
+            rows.append({
+                "Chunks": size,
+                "Backend": name,
+                "Build (s)": f"{build['build_seconds']:.2f}",
+                "Resident (MB)": f"{build['resident_mb']:.1f}",
+                "Peak (MB)": f"{build['peak_mb']:.1f}",
+                "Query (ms)": f"{self._query_ms(backend, queries):.2f}",
+                "Filtered (ms)": f"{self._query_ms(backend, queries, {'federation': 'IBJJF', 'category': 'techniques'}):.2f}"
+            })
+
+        overlap = self._overlap(backends["qdrant"], backends["numpy"], queries[:10])
+        for row in rows:
+            row["Top-k overlap"] = f"{overlap:.3f}"
+        for backend in backends.values():
+            backend.close()
+        return rows
+
+    def run(self, sizes: List[int] = (1000, 10000, 100000)) -> List[Dict[str, Any]]:
+        rows = [row for size in sizes for row in self.compare(size)]
+
+        print("\n" + "="*60)
+        print("VECTOR BACKEND BENCHMARK - QDRANT LOCAL VS NUMPY EXACT SEARCH")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector backends on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dimensions", type=int, default=3072)
+    args = parser.parse_args()
+
+    BackendBenchmark(dimensions=args.dimensions).run(args.sizes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import PyPDF2
+import pandas as pd
+from pathlib import Path
+from typing import List, Dict, Any
+
+from config import ASSETS_DIR
+from src.extraction.processing_strategy import FastProcessingStrategy, StructuredProcessingStrategy, HybridProcessingStrategy
+from src.extraction.metadata_extractor import MetadataExtractor
+
+class ExtractionBenchmark:
+    """Compares StructuredProcessingStrategy with table-routed HybridProcessingStrategy."""
+
+    def __init__(self):
+        self.metadata_extractor = MetadataExtractor()
+        self.strategies = {
+            "structured": StructuredProcessingStrategy(),
+            "hybrid": HybridProcessingStrategy()
+        }
+
+    def _structured_pdfs(self) -> List[Path]:
+        return sorted(
+            pdf for pdf in Path(ASSETS_DIR).glob("*.pdf")
+            if "legal_techniques" in pdf.name.lower()
+        )
+
+    def _tokens(self, text: str) -> set:
+        return set(text.lower().split())
+
+    def _run_strategy(self, name: str, pdf_file: Path) -> Dict[str, Any]:
+        strategy = self.strategies[name]
+        extractor = strategy.get_extractor()
+
+        start = time.perf_counter()
+        content = extractor.extract(str(pdf_file))
+        extract_seconds = time.perf_counter() - start
+
+        federation = self.metadata_extractor.determine_federation(pdf_file.name)
+        chunks = strategy._create_chunks(
+            content['text'], federation, pdf_file.name,
+            content.get('page_offsets'), content.get('page_numbers')
+        )
+
+        return {
+            "seconds": extract_seconds,
+            "content": content,
+            "chunks": chunks
+        }
+
+    def compare(self, pdf_file: Path) -> Dict[str, Any]:
+        print(f"Benchmarking {pdf_file.name}...")
+        structured = self._run_strategy("structured", pdf_file)
+        hybrid = self._run_strategy("hybrid", pdf_file)
+
+        structured_tokens = self._tokens(structured["content"]["text"])
+        hybrid_tokens = self._tokens(hybrid["content"]["text"])
+        union = structured_tokens | hybrid_tokens
+        token_jaccard = len(structured_tokens & hybrid_tokens) / len(union) if union else 1.0
+
+        structured_tables = {table["text"] for table in structured["content"]["tables"]}
+        hybrid_tables = {table["text"] for table in hybrid["content"]["tables"]}
+        table_recall = (
+            len(structured_tables & hybrid_tables) / len(structured_tables)
+            if structured_tables else 1.0
+        )
+
+        return {
+            "File": pdf_file.name,
+            "Structured (s)": f"{structured['seconds']:.2f}",
+            "Hybrid (s)": f"{hybrid['seconds']:.2f}",
+            "Speedup": f"{structured['seconds'] / max(hybrid['seconds'], 1e-9):.1f}x",
+            "Chunks (S/H)": f"{len(structured['chunks'])}/{len(hybrid['chunks'])}",
+            "Tables (S/H)": f"{len(structured_tables)}/{len(hybrid_tables)}",
+            "Table Recall": f"{table_recall:.3f}",
+            "Token Jaccard": f"{token_jaccard:.3f}"
+        }
+
+    def run(self) -> List[Dict[str, Any]]:
+        pdf_files = self._structured_pdfs()
+        if not pdf_files:
+            print(f"No structured PDF files found in {ASSETS_DIR}")
+            return []
+
+        rows = [self.compare(pdf_file) for pdf_file in pdf_files]
+
+        print("\n" + "="*60)
+        print("EXTRACTION BENCHMARK - STRUCTURED VS TABLE-ROUTED HYBRID")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+class MemoryBenchmark:
+    """Measures tracemalloc peaks of whole-document versus page-streamed extraction."""
+
+    def __init__(self, source_pdf: str = None):
+        self.source_pdf = source_pdf or str(Path(ASSETS_DIR) / "ADCC_Rules.pdf")
+        self.strategy = FastProcessingStrategy()
+
+    def _build_rulebook(self, page_count: int) -> str:
+        # Repeat the source pages to synthesise a rulebook of the requested length
+        with open(self.source_pdf, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            writer = PyPDF2.PdfWriter()
+            for i in range(page_count):
+                writer.add_page(reader.pages[i % len(reader.pages)])
+
+            handle, path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(handle, 'wb') as output:
+                writer.write(output)
+        return path
+
+    def _whole_document(self, pdf_path: str) -> int:
+        content = self.strategy.get_extractor().extract_pages(pdf_path)
+        chunks = self.strategy._create_chunks(
+            content['text'], "IBJJF", "benchmark.pdf",
+            content['page_offsets'], content['page_numbers']
+        )
+        return len(chunks)
+
+    def _streamed(self, pdf_path: str) -> int:
+        # Chunks are counted, not kept, so the peak reflects extraction rather than the output list
+        return sum(1 for _ in self.strategy.iter_process(pdf_path, "IBJJF", "benchmark.pdf"))
+
+    def _measure(self, run, pdf_path: str) -> Dict[str, Any]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunk_count = run(pdf_path)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"chunks": chunk_count, "peak_mb": peak / 1e6, "seconds": seconds}
+
+    def run(self, page_counts: List[int] = (50, 200, 400)) -> List[Dict[str, Any]]:
+        rows = []
+        for page_count in page_counts:
+            pdf_path = self._build_rulebook(page_count)
+            try:
+                whole = self._measure(self._whole_document, pdf_path)
+                streamed = self._measure(self._streamed, pdf_path)
+            finally:
+                os.unlink(pdf_path)
+
+            rows.append({
+                "Pages": page_count,
+                "Chunks": f"{whole['chunks']}/{streamed['chunks']}",
+                "Whole peak (MB)": f"{whole['peak_mb']:.2f}",
+                "Streamed peak (MB)": f"{streamed['peak_mb']:.2f}",
+                "Whole (s)": f"{whole['seconds']:.2f}",
+                "Streamed (s)": f"{streamed['seconds']:.2f}"
+            })
+
+        print("\n" + "="*60)
+        print("EXTRACTION MEMORY BENCHMARK - WHOLE DOCUMENT VS PAGE-STREAMED")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF extraction strategies")
+    parser.add_argument("--memory", action="store_true",
+                        help="profile tracemalloc peaks of whole-document vs page-streamed extraction")
+    args = parser.parse_args()
+
+    if args.memory:
+        MemoryBenchmark().run()
+    else:
+        ExtractionBenchmark().run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any
+
+from src.extraction.pdf_processor import PDFProcessor
+from src.vector_db.qdrant_setup import QdrantManager
+from src.agents.retrieval_agent import RetrievalAgent
+from src.agents.query_expansion import ThesaurusExpander
+from src.models.rules import RuleChunk
+from src.evaluation.golden_dataset import get_golden_dataset
+
+class FusionBenchmark:
+    """Compares candidate recall@k of the legacy sort-truncate-dedup selection with reciprocal
+    rank fusion keyed on chunk IDs, over the golden dataset questions.
+
+    The reference set for each question is the chunks most similar to its ground-truth answer.
+    Fusion queries come from the offline thesaurus, so the run makes no LLM calls.
+    """
+
+    def __init__(self, ks: List[int] = (5, 10, 15, 20), reference_size: int = 5, results_per_query: int = 7):
+        self.ks = list(ks)
+        self.reference_size = reference_size
+        self.results_per_query = results_per_query
+        self.qdrant_manager = QdrantManager()
+        self.agent = RetrievalAgent(self.qdrant_manager)
+        self.expander = ThesaurusExpander()
+
+    @staticmethod
+    def _federation_filter(federation: str):
+        return federation if federation in ("IBJJF", "ADCC") else None
+
+    @staticmethod
+    def legacy_selection(results: List[RuleChunk], k: int) -> List[RuleChunk]:
+        # The previous retrieve(): sort raw scores across queries, truncate, then drop duplicates
+        ranked = sorted(results, key=lambda x: x.retrieval_score or 0, reverse=True)[:k]
+        unique = []
+        seen = set()
+        for result in ranked:
+            if hash(result.content) not in seen:
+                seen.add(hash(result.content))
+                unique.append(result)
+        return unique
+
+    def _recall(self, reference: set, selected: List[RuleChunk]) -> float:
+        return len(reference & {RetrievalAgent.chunk_key(chunk) for chunk in selected}) / len(reference) if reference else 1.0
+
+    def run(self) -> List[Dict[str, Any]]:
+        self.qdrant_manager.load_or_build(PDFProcessor())
+        dataset = get_golden_dataset()
+        print(f"Benchmarking fusion over {len(dataset)} golden questions...")
+
+        scores = {k: {"legacy": [], "rrf": [], "legacy_distinct": [], "rrf_distinct": []} for k in self.ks}
+        for item in dataset:
+            federation_filter = self._federation_filter(item["federation"])
+            reference = {
+                result["metadata"].get("chunk_id") or result["content"]
+                for result in self.qdrant_manager.search_similar(
+                    item["ground_truth"], federation_filter=federation_filter, limit=self.reference_size
+                )
+            }
+
+            question = item["question"]
+            queries = [question] + self.agent._unique_queries(self.expander.expand(question))
+            results = self.agent.retrieve_chunks(queries, federation_filter)
+            fused = RetrievalAgent.fuse_results(results, question)
+
+            for k in self.ks:
+                legacy = self.legacy_selection(results, k)
+                rrf = fused[:k]
+                scores[k]["legacy"].append(self._recall(reference, legacy))
+                scores[k]["rrf"].append(self._recall(reference, rrf))
+                scores[k]["legacy_distinct"].append(len(legacy))
+                scores[k]["rrf_distinct"].append(len(rrf))
+
+        rows = [
+            {
+                "RERANK_TOP_K": k,
+                "Legacy recall": f"{np.mean(scores[k]['legacy']):.3f}",
+                "RRF recall": f"{np.mean(scores[k]['rrf']):.3f}",
+                "Legacy distinct": f"{np.mean(scores[k]['legacy_distinct']):.1f}",
+                "RRF distinct": f"{np.mean(scores[k]['rrf_distinct']):.1f}"
+            }
+            for k in self.ks
+        ]
+
+        print("\n" + "="*60)
+        print("FUSION BENCHMARK - CANDIDATE RECALL@K BEFORE RERANKING")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy candidate selection with reciprocal rank fusion")
+    parser.add_argument("--ks", type=int, nargs="+", default=[5, 10, 15, 20])
+    parser.add_argument("--reference-size", type=int, default=5)
+    args = parser.parse_args()
+
+    FusionBenchmark(ks=args.ks, reference_size=args.reference_size).run()
+
+if __name__ == "__main__":
+    main()
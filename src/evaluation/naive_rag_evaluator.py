@@ -3,7 +3,7 @@ from typing import List, Dict, Any
 from datasets import Dataset
 from ragas import evaluate
 from ragas.metrics import faithfulness, answer_relevancy, context_precision, context_recall
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -11,14 +11,15 @@ from langchain_qdrant import Qdrant
 import os
 
 from src.vector_db.qdrant_setup import QdrantManager
+from src.vector_db.embedding_cache import build_embeddings
 from src.evaluation.golden_dataset import get_golden_dataset
-from config import EMBEDDING_MODEL
 
 class NaiveRAGEvaluator:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-        self.embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+        self.embeddings = build_embeddings()
         self.qdrant_manager = QdrantManager()
+        self.vectorstore = None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=50,
@@ -56,7 +57,7 @@ class NaiveRAGEvaluator:
         
         documents = self.naive_process_pdfs()
         
-        self.qdrant_manager.vectorstore = Qdrant.from_documents(
+        self.vectorstore = Qdrant.from_documents(
             documents,
             self.qdrant_manager.embeddings,
             location=":memory:",
@@ -66,7 +67,7 @@ class NaiveRAGEvaluator:
         print(f"Naive system initialized with {len(documents)} rule chunks")
     
     def naive_retrieve(self, question: str, k: int = 5) -> List[str]:
-        results = self.qdrant_manager.vectorstore.similarity_search(question, k=k)
+        results = self.vectorstore.similarity_search(question, k=k)
         return [doc.page_content for doc in results]
     
     def naive_generate_answer(self, question: str, contexts: List[str]) -> str:
@@ -3,19 +3,19 @@ from typing import List, Dict, Any
 from datasets import Dataset
 from ragas import evaluate
 from ragas.metrics import faithfulness, answer_relevancy, context_precision, context_recall
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 
 from src.orchestration.workflow import BJJRuleWorkflow
 from src.vector_db.qdrant_setup import QdrantManager
+from src.vector_db.embedding_cache import build_embeddings
 from src.extraction.pdf_processor import PDFProcessor
 from src.evaluation.golden_dataset import get_golden_dataset
 from src.models.enums import Federation
-from config import EMBEDDING_MODEL
 
 class ComprehensiveRAGASEvaluator:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-        self.embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+        self.embeddings = build_embeddings()
         
         self.pdf_processor = PDFProcessor()
         self.qdrant_manager = QdrantManager()
@@ -24,12 +24,11 @@ class ComprehensiveRAGASEvaluator:
     def initialize_system(self):
         print("Initializing CornerGuide system...")
         
-        chunks = self.pdf_processor.process_all_pdfs()
-        self.qdrant_manager.create_from_chunks(chunks)
+        self.qdrant_manager.load_or_build(self.pdf_processor)
         
         self.workflow = BJJRuleWorkflow(self.qdrant_manager)
         
-        print(f"System initialized with {len(chunks)} rule chunks")
+        print(f"System initialized with {self.qdrant_manager.chunk_count} rule chunks")
     
     def _map_federation_string(self, federation_str: str) -> Federation:
         mapping = {
@@ -83,6 +82,15 @@ class ComprehensiveRAGASEvaluator:
         
         print("Generating system responses...")
         dataset = self.generate_system_responses(test_data)
+        if self.qdrant_manager.query_cache:
+            self.qdrant_manager.query_cache.report()
+        self.workflow.retrieval_agent.report_reformulations()
+        if self.workflow.retrieval_agent.speculative:
+            self.workflow.retrieval_agent.report_speculation()
+        if self.workflow.retrieval_agent.rerank_policy:
+            self.workflow.retrieval_agent.rerank_policy.report()
+        if self.workflow.retrieval_agent.rerank_cache:
+            self.workflow.retrieval_agent.rerank_cache.report()
         
         print("Running RAGAS evaluation with all required metrics...")
         
@@ -0,0 +1,102 @@
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any
+
+from config import RETRIEVAL_MODE
+from src.extraction.pdf_processor import PDFProcessor
+from src.vector_db.qdrant_setup import QdrantManager
+from src.agents.retrieval_agent import RetrievalAgent, LLM_REFORMULATIONS
+from src.agents.query_expansion import ThesaurusExpander
+from src.evaluation.golden_dataset import get_golden_dataset
+
+class ReformulationBenchmark:
+    """Compares fused candidate recall@k over the golden dataset for each source of fusion queries.
+
+    "original" searches the question alone, "thesaurus" adds the offline thesaurus rewrites,
+    "llm" adds GPT reformulations and "served" uses whatever generate_fusion_queries would
+    serve without the reformulation cache. The reference set for each question is the chunks
+    most similar to its ground-truth answer. Mode "fast" ranks with BM25 only, so apart from
+    the LLM column the run needs no API calls once the index exists.
+    """
+
+    def __init__(self, ks: List[int] = (5, 10, 20), reference_size: int = 5, mode: str = RETRIEVAL_MODE,
+                 use_llm: bool = True):
+        self.ks = list(ks)
+        self.reference_size = reference_size
+        self.mode = mode
+        self.use_llm = use_llm
+        self.qdrant_manager = QdrantManager()
+        self.agent = RetrievalAgent(self.qdrant_manager, retrieval_mode=mode)
+        self.agent.reformulation_cache = None
+        self.expander = ThesaurusExpander()
+
+    @staticmethod
+    def _federation_filter(federation: str):
+        return federation if federation in ("IBJJF", "ADCC") else None
+
+    def _query_sets(self, question: str) -> Dict[str, List[str]]:
+        thesaurus = self.agent._unique_queries(self.expander.expand(question, LLM_REFORMULATIONS))
+        query_sets = {"original": [question], "thesaurus": [question] + thesaurus}
+        if self.use_llm:
+            llm = self.agent._llm_reformulations(question)
+            query_sets["llm"] = [question] + llm
+            served = thesaurus if len(thesaurus) >= LLM_REFORMULATIONS else llm
+            query_sets["served"] = [question] + served
+        return query_sets
+
+    def run(self) -> List[Dict[str, Any]]:
+        self.qdrant_manager.load_or_build(PDFProcessor())
+        dataset = get_golden_dataset()
+        print(f"Benchmarking fusion query sources over {len(dataset)} golden questions ({self.mode} retrieval)...")
+
+        recalls: Dict[str, Dict[int, List[float]]] = {}
+        expanded: Dict[str, int] = {}
+        for item in dataset:
+            federation_filter = self._federation_filter(item["federation"])
+            reference = {
+                result["metadata"].get("chunk_id") or result["content"]
+                for result in self.qdrant_manager.search_similar(
+                    item["ground_truth"], federation_filter=federation_filter,
+                    limit=self.reference_size, mode=self.mode
+                )
+            }
+
+            question = item["question"]
+            for source, queries in self._query_sets(question).items():
+                fused = RetrievalAgent.fuse_results(self.agent.retrieve_chunks(queries, federation_filter), question)
+                keys = [RetrievalAgent.chunk_key(chunk) for chunk in fused]
+                for k in self.ks:
+                    recall = len(reference & set(keys[:k])) / len(reference) if reference else 1.0
+                    recalls.setdefault(source, {}).setdefault(k, []).append(recall)
+                expanded[source] = expanded.get(source, 0) + (len(queries) > 1)
+
+        rows = [
+            {
+                "Source": source,
+                "Questions expanded": f"{expanded[source]}/{len(dataset)}",
+                **{f"Recall@{k}": f"{np.mean(recalls[source][k]):.3f}" for k in self.ks}
+            }
+            for source in recalls
+        ]
+
+        print("\n" + "="*60)
+        print("REFORMULATION BENCHMARK - FUSED RECALL@K BY QUERY SOURCE")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fusion query sources on the golden dataset")
+    parser.add_argument("--ks", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--reference-size", type=int, default=5)
+    parser.add_argument("--mode", choices=["dense", "hybrid", "fast"], default=RETRIEVAL_MODE)
+    parser.add_argument("--no-llm", action="store_true", help="Skip the GPT reformulation columns")
+    args = parser.parse_args()
+
+    ReformulationBenchmark(
+        ks=args.ks, reference_size=args.reference_size, mode=args.mode, use_llm=not args.no_llm
+    ).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any
+
+from config import TOP_K_RETRIEVAL, RERANK_TOP_K
+from src.extraction.pdf_processor import PDFProcessor
+from src.vector_db.qdrant_setup import QdrantManager
+from src.agents.retrieval_agent import RetrievalAgent
+from src.agents.rerank_policy import RerankPolicy
+from src.models.rules import RuleChunk
+from src.evaluation.golden_dataset import get_golden_dataset
+
+class RerankPolicyBenchmark:
+    """Compares the final top-k context with the rerank policy on and off over the golden dataset.
+
+    Every question's fused candidates are reranked in full once; with the policy on, the top-k
+    is the dense order for a skip and the head reordered by the same Cohere scores otherwise,
+    which is what a head-only rerank returns since each relevance score depends only on the
+    query and the document. Recall is measured against the chunks most similar to the
+    ground-truth answer, and overlap against the full rerank's top-k.
+    """
+
+    def __init__(self, reference_size: int = 5):
+        self.reference_size = reference_size
+        self.qdrant_manager = QdrantManager()
+        self.agent = RetrievalAgent(self.qdrant_manager, retrieval_mode="dense")
+        self.policy = RerankPolicy()
+
+    @staticmethod
+    def _federation_filter(federation: str):
+        return federation if federation in ("IBJJF", "ADCC") else None
+
+    @staticmethod
+    def _keys(chunks: List[RuleChunk]) -> set:
+        return {RetrievalAgent.chunk_key(chunk) for chunk in chunks}
+
+    def _candidates(self, question: str, federation_filter) -> List[RuleChunk]:
+        refined_question = {"refined_question": question}
+        if self.agent.speculative:
+            return self.agent._retrieve_speculative(refined_question, federation_filter)
+        return self.agent.retrieve_chunks(self.agent.generate_fusion_queries(refined_question), federation_filter)
+
+    def run(self) -> List[Dict[str, Any]]:
+        if not self.agent.cohere_client:
+            print("Error: COHERE_API_KEY is required to compare the rerank policy")
+            return []
+
+        self.qdrant_manager.load_or_build(PDFProcessor())
+        dataset = get_golden_dataset()
+        print(f"Benchmarking the rerank policy over {len(dataset)} golden questions...")
+
+        scores = {"off": {"recall": [], "overlap": [], "reranked": []},
+                  "on": {"recall": [], "overlap": [], "reranked": []}}
+        for item in dataset:
+            federation_filter = self._federation_filter(item["federation"])
+            question = item["question"]
+            reference = {
+                result["metadata"].get("chunk_id") or result["content"]
+                for result in self.qdrant_manager.search_similar(
+                    item["ground_truth"], federation_filter=federation_filter, limit=self.reference_size
+                )
+            }
+
+            raw_results = self._candidates(question, federation_filter)
+            fused = RetrievalAgent.fuse_results(raw_results, question)
+            if not fused:
+                continue
+            candidates = fused[:RERANK_TOP_K]
+            reranked = self.agent._rerank_with_cohere(question, candidates)
+            rerank_scores = {RetrievalAgent.chunk_key(chunk): chunk.rerank_score for chunk in reranked}
+            full = reranked[:TOP_K_RETRIEVAL]
+
+            size = self.policy.decide(raw_results, fused, RetrievalAgent.chunk_key, question)
+            if size:
+                head = sorted(candidates[:size], key=lambda chunk: rerank_scores[RetrievalAgent.chunk_key(chunk)] or 0,
+                              reverse=True)
+                policy = head[:TOP_K_RETRIEVAL]
+            else:
+                policy = fused[:TOP_K_RETRIEVAL]
+
+            for name, selected, count in (("off", full, len(candidates)), ("on", policy, min(size, len(candidates)))):
+                scores[name]["recall"].append(len(reference & self._keys(selected)) / len(reference) if reference else 1.0)
+                scores[name]["overlap"].append(len(self._keys(full) & self._keys(selected)) / max(len(full), 1))
+                scores[name]["reranked"].append(count)
+
+        rows = [
+            {
+                "Policy": name,
+                f"Recall@{TOP_K_RETRIEVAL}": f"{np.mean(values['recall']):.3f}",
+                "Overlap with full rerank": f"{np.mean(values['overlap']):.3f}",
+                "Documents reranked": f"{np.mean(values['reranked']):.1f}"
+            }
+            for name, values in scores.items()
+        ]
+
+        print("\n" + "="*60)
+        print("RERANK POLICY BENCHMARK - FINAL CONTEXT WITH THE POLICY ON AND OFF")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        self.policy.report()
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare final retrieval context with the rerank policy on and off")
+    parser.add_argument("--reference-size", type=int, default=5)
+    args = parser.parse_args()
+
+    RerankPolicyBenchmark(reference_size=args.reference_size).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Optional
+
+from config import RESCORE_CANDIDATES
+from src.extraction.pdf_processor import PDFProcessor
+from src.vector_db.qdrant_setup import QdrantManager
+from src.vector_db.backends import VectorBackend, NumpyBackend, ShortlistBackend
+from src.evaluation.golden_dataset import get_golden_dataset
+
+# (shortlist dimensions, int8) pairs, each compared against exact full-precision search
+SHORTLIST_CONFIGS = [(1024, False), (512, False), (256, False), (256, True), (128, True)]
+
+class ShortlistBenchmark:
+    """Measures recall against exact full-precision search and latency of shortlist index modes
+    over the golden dataset questions."""
+
+    def __init__(self, limit: int = 7, corpus_size: int = 0, repeats: int = 5, seed: int = 11):
+        self.limit = limit
+        self.corpus_size = corpus_size
+        self.repeats = repeats
+        self.rng = np.random.default_rng(seed)
+        self.qdrant_manager = QdrantManager(persist=False)
+
+    def _load_corpus(self):
+        chunks = PDFProcessor().process_all_pdfs()
+        documents = [self.qdrant_manager._chunk_to_document(chunk) for chunk in chunks]
+        vectors = np.asarray(self.qdrant_manager.embeddings.embed_documents(
+            [doc.page_content for doc in documents]
+        ), dtype=np.float32)
+
+        # Optional distractors: perturbed copies of real chunks, so latency can be read at a larger scale
+        if self.corpus_size > len(documents):
+            extra = self.corpus_size - len(documents)
+            sources = self.rng.integers(0, len(documents), size=extra)
+            noise = self.rng.standard_normal((extra, vectors.shape[1]), dtype=np.float32)
+            noise *= 0.5 * np.linalg.norm(vectors[sources], axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+            vectors = np.vstack([vectors, vectors[sources] + noise])
+            documents = documents + [
+                documents[source].model_copy(update={
+                    "metadata": {**documents[source].metadata, "chunk_id": f"distractor-{i}"}
+                })
+                for i, source in enumerate(sources)
+            ]
+
+        ids = [str(i) for i in range(len(documents))]
+        return ids, vectors, documents
+
+    def _load_questions(self):
+        dataset = get_golden_dataset()
+        vectors = self.qdrant_manager.embeddings.embed_documents([item["question"] for item in dataset])
+        filters = [
+            {"federation": item["federation"]} if item["federation"] in ("IBJJF", "ADCC") else None
+            for item in dataset
+        ]
+        return vectors, filters
+
+    def _search(self, backend: VectorBackend, vectors, filters) -> List[List[str]]:
+        return [
+            [doc.metadata.get("chunk_id") for doc, _ in backend.search([vector], filter_dict, self.limit)[0]]
+            for vector, filter_dict in zip(vectors, filters)
+        ]
+
+    def _latency_ms(self, backend: VectorBackend, vectors, filters) -> float:
+        best = float("inf")
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            self._search(backend, vectors, filters)
+            best = min(best, time.perf_counter() - start)
+        return best / len(vectors) * 1e3
+
+    def _recall(self, reference: List[List[str]], results: List[List[str]]) -> float:
+        return float(np.mean([
+            len(set(expected) & set(actual)) / len(expected) if expected else 1.0
+            for expected, actual in zip(reference, results)
+        ]))
+
+    def _row(self, label: str, backend: VectorBackend, reference, vectors, filters,
+             rescore: Optional[int]) -> Dict[str, Any]:
+        scale_bytes = 4 if isinstance(backend, ShortlistBackend) else 0
+        return {
+            "Index": label,
+            "Rescore": rescore if rescore is not None else "-",
+            "Bytes/chunk (RAM)": backend.matrix.shape[1] * backend.matrix.itemsize + scale_bytes,
+            f"Recall@{self.limit}": f"{self._recall(reference, self._search(backend, vectors, filters)):.3f}",
+            "Latency (ms/query)": f"{self._latency_ms(backend, vectors, filters):.3f}"
+        }
+
+    def run(self, configs=SHORTLIST_CONFIGS, rescore_options=(0, RESCORE_CANDIDATES)) -> List[Dict[str, Any]]:
+        ids, corpus, documents = self._load_corpus()
+        question_vectors, filters = self._load_questions()
+        print(f"Benchmarking {len(question_vectors)} golden questions over {len(ids)} chunks "
+              f"({corpus.shape[1]} dimensions)...")
+
+        full = NumpyBackend()
+        full.create(corpus.shape[1])
+        full.upsert(ids, corpus, documents)
+        reference = self._search(full, question_vectors, filters)
+        rows = [self._row("full float32", full, reference, question_vectors, filters, None)]
+
+        for dimensions, quantize in configs:
+            if dimensions >= corpus.shape[1]:
+                continue
+            backend = ShortlistBackend(dimensions=dimensions, quantize=quantize)
+            backend.create(corpus.shape[1])
+            backend.upsert(ids, corpus, documents)
+            label = f"{dimensions}d {'int8' if quantize else 'float32'}"
+            for rescore in rescore_options:
+                backend.rescore_candidates = rescore
+                rows.append(self._row(label, backend, reference, question_vectors, filters, rescore))
+            backend.close()
+
+        print("\n" + "="*60)
+        print("SHORTLIST INDEX BENCHMARK - ACCURACY VS LATENCY (GOLDEN DATASET)")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare shortlist index modes on the golden dataset")
+    parser.add_argument("--corpus-size", type=int, default=0,
+                        help="pad the corpus with perturbed distractor chunks to this many rows")
+    args = parser.parse_args()
+
+    ShortlistBenchmark(corpus_size=args.corpus_size).run()
+
+if __name__ == "__main__":
+    main()
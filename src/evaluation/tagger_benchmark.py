@@ -0,0 +1,88 @@
+import time
+import pandas as pd
+from typing import List, Dict, Any, Callable
+
+from src.extraction.pdf_processor import PDFProcessor
+from src.extraction.content_categorizer import ContentCategorizer
+from src.extraction.metadata_extractor import MetadataExtractor, TECHNIQUES
+from src.extraction.metadata_tagger import MetadataTagger
+
+class TaggerBenchmark:
+    """Checks MetadataTagger against the per-field extractors and times both."""
+
+    def __init__(self, repeats: int = 5):
+        self.repeats = repeats
+        self.categorizer = ContentCategorizer()
+        self.metadata_extractor = MetadataExtractor()
+
+    def load_texts(self) -> List[str]:
+        chunks = PDFProcessor().process_all_pdfs()
+        return [chunk.content for chunk in chunks]
+
+    def legacy_tag(self, text: str, techniques: List[str] = TECHNIQUES) -> Dict[str, Any]:
+        text_lower = text.lower()
+        technique = next((t.replace(" ", "_") for t in techniques if t in text_lower), None)
+        return {
+            "category": self.categorizer.categorize_content(text),
+            "belt_level": self.metadata_extractor.extract_belt_level(text),
+            "technique": technique,
+            "source_page": self.metadata_extractor.extract_source_page(text)
+        }
+
+    def _time_per_chunk(self, texts: List[str], tag: Callable[[str], Any]) -> float:
+        best = float("inf")
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            for text in texts:
+                tag(text)
+            best = min(best, time.perf_counter() - start)
+        return best / len(texts) * 1e6
+
+    def check_parity(self, texts: List[str]) -> int:
+        tagger = MetadataTagger()
+        mismatches = 0
+        for text in texts:
+            expected = self.legacy_tag(text)
+            actual = tagger.tag(text).model_dump()
+            if expected != actual:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"Mismatch: {text[:80]!r}\n  legacy={expected}\n  tagger={actual}")
+        return mismatches
+
+    def run(self, vocabulary_sizes: List[int] = (0, 100, 500)) -> List[Dict[str, Any]]:
+        texts = self.load_texts()
+        if not texts:
+            print("No chunks available to benchmark")
+            return []
+
+        mismatches = self.check_parity(texts)
+        print(f"Parity: {len(texts) - mismatches}/{len(texts)} chunks tagged identically")
+
+        rows = []
+        for extra_terms in vocabulary_sizes:
+            # Synthetic terms never match, so they only measure how scan cost grows with vocabulary
+            techniques = TECHNIQUES + [f"synthetic technique {i:04d}" for i in range(extra_terms)]
+            tagger = MetadataTagger(techniques=techniques)
+
+            legacy_us = self._time_per_chunk(texts, lambda text: self.legacy_tag(text, techniques))
+            tagger_us = self._time_per_chunk(texts, tagger.tag)
+            rows.append({
+                "Techniques": len(techniques),
+                "Legacy (us/chunk)": f"{legacy_us:.1f}",
+                "Tagger (us/chunk)": f"{tagger_us:.1f}",
+                "Speedup": f"{legacy_us / tagger_us:.1f}x"
+            })
+
+        print("\n" + "="*60)
+        print("METADATA TAGGER MICRO-BENCHMARK")
+        print("="*60)
+        print(pd.DataFrame(rows).to_string(index=False))
+        return rows
+
+def main():
+    benchmark = TaggerBenchmark()
+    benchmark.run()
+
+if __name__ == "__main__":
+    main()
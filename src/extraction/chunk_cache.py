@@ -0,0 +1,95 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+from config import CACHE_DIR, CHUNK_SIZE, CHUNK_OVERLAP, EXTRACTOR_VERSION, MEMORY_BOUNDED_EXTRACTION
+from src.models.rules import RuleChunk
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ChunkCache:
+    """On-disk cache of extracted RuleChunks keyed by PDF content and extraction settings."""
+
+    def __init__(self, cache_dir: str = None):
+        self.cache_dir = Path(cache_dir or CACHE_DIR) / "chunks"
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def make_key(self, content_hash: str, strategy_name: str) -> str:
+        key_source = "|".join([
+            content_hash,
+            strategy_name,
+            str(CHUNK_SIZE),
+            str(CHUNK_OVERLAP),
+            EXTRACTOR_VERSION,
+            "streaming" if MEMORY_BOUNDED_EXTRACTION else "whole"
+        ])
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[RuleChunk]]:
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            self.misses += 1
+            return None
+
+        try:
+            payload = entry_path.read_bytes()
+            chunks = [RuleChunk.model_validate(item) for item in json.loads(payload)["chunks"]]
+        except Exception as e:
+            print(f"Warning: Discarding unreadable chunk cache entry {entry_path.name}: {e}")
+            entry_path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.bytes_read += len(payload)
+        return chunks
+
+    def put(self, key: str, chunks: List[RuleChunk], source_file: str = None):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            payload = json.dumps({
+                "source_file": source_file,
+                "chunks": [chunk.model_dump(mode="json") for chunk in chunks]
+            }).encode("utf-8")
+            # Write to a temp file first so a crash never leaves a truncated entry behind
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path.with_suffix(".tmp")
+            tmp_path.write_bytes(payload)
+            tmp_path.replace(entry_path)
+            self.bytes_written += len(payload)
+        except Exception as e:
+            print(f"Warning: Failed to write chunk cache entry for {source_file}: {e}")
+
+    def invalidate(self, key: str = None) -> int:
+        if not self.cache_dir.exists():
+            return 0
+
+        entries = [self._entry_path(key)] if key else list(self.cache_dir.glob("*.json"))
+        removed = 0
+        for entry_path in entries:
+            if entry_path.exists():
+                entry_path.unlink()
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = list(self.cache_dir.glob("*.json")) if self.cache_dir.exists() else []
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": len(entries),
+            "bytes_on_disk": sum(entry.stat().st_size for entry in entries)
+        }
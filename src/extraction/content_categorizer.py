@@ -1,22 +1,20 @@
 from src.models.enums import Category, BeltLevel
 
+# Checked in order; the first category with a matching keyword wins
+CATEGORY_KEYWORDS = [
+    (Category.SCORING, ["points", "scoring", "advantage", "mount", "guard", "takedown"]),
+    (Category.TIME_LIMITS, ["time", "minutes", "duration", "match"]),
+    (Category.TECHNIQUES, ["technique", "legal", "illegal", "allowed", "prohibited", "submission", "leg lock", "heel hook"]),
+    (Category.PENALTIES, ["penalty", "infraction", "foul", "disqualification"]),
+    (Category.DIVISIONS, ["belt", "division", "age", "weight", "category"]),
+]
+
 class ContentCategorizer:
     def categorize_content(self, text: str) -> Category:
         text_lower = text.lower()
         
-        if any(word in text_lower for word in ["points", "scoring", "advantage", "mount", "guard", "takedown"]):
-            return Category.SCORING
-        
-        if any(word in text_lower for word in ["time", "minutes", "duration", "match"]):
-            return Category.TIME_LIMITS
-            
-        if any(word in text_lower for word in ["technique", "legal", "illegal", "allowed", "prohibited", "submission", "leg lock", "heel hook"]):
-            return Category.TECHNIQUES
-            
-        if any(word in text_lower for word in ["penalty", "infraction", "foul", "disqualification"]):
-            return Category.PENALTIES
-            
-        if any(word in text_lower for word in ["belt", "division", "age", "weight", "category"]):
-            return Category.DIVISIONS
+        for category, keywords in CATEGORY_KEYWORDS:
+            if any(word in text_lower for word in keywords):
+                return category
             
-        return Category.GENERAL
\ No newline at end of file
+        return Category.GENERAL
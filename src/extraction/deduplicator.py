@@ -0,0 +1,113 @@
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import List, Optional, Dict, Any
+from config import DEDUP_THRESHOLD, MINHASH_PERMUTATIONS, LSH_BANDS, RERANK_TOP_K
+from src.models.rules import RuleChunk
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+class ChunkDeduplicator:
+    """Collapses near-duplicate chunks using MinHash signatures with LSH banding.
+
+    Chunks are compared across the whole corpus, so a rulebook copied under another name
+    collapses into the first copy seen. Which copy survives depends on the order files are
+    added, so an incremental sync re-checks the files whose canonical chunks change.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = MINHASH_PERMUTATIONS,
+                 bands: int = LSH_BANDS, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self.hash_a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.hash_b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self.buckets = defaultdict(list)
+        self.canonical_chunks: List[RuleChunk] = []
+        self.signatures: List[np.ndarray] = []
+        self.seen = 0
+        self.duplicates = 0
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        if len(words) <= self.shingle_size:
+            grams = [" ".join(words)]
+        else:
+            grams = [
+                " ".join(words[i:i + self.shingle_size])
+                for i in range(len(words) - self.shingle_size + 1)
+            ]
+        hashes = {zlib.crc32(gram.encode("utf-8")) & 0x7FFFFFFF for gram in grams}
+        return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self._shingles(text)
+        # Universal hashing (a*x + b) mod p; both factors stay below 2^31 so uint64 never overflows
+        hashed = (np.outer(shingles, self.hash_a) + self.hash_b) % _MERSENNE_PRIME
+        return hashed.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[tuple]:
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _merge_into(self, canonical: RuleChunk, duplicate: RuleChunk):
+        metadata = canonical.metadata or {}
+        duplicate_metadata = duplicate.metadata or {}
+        metadata.setdefault("duplicate_sources", []).append({
+            "source_file": duplicate_metadata.get("source_file"),
+            "content_hash": duplicate_metadata.get("content_hash"),
+            "source_page": duplicate.source_page,
+            "chunk_id": duplicate_metadata.get("chunk_id")
+        })
+        canonical.metadata = metadata
+
+    def add(self, chunk: RuleChunk) -> Optional[RuleChunk]:
+        """Register a chunk; returns its canonical chunk if it is a near-duplicate, else None."""
+        self.seen += 1
+        signature = self.signature(chunk.content)
+        band_keys = self._band_keys(signature)
+
+        candidates = {index for key in band_keys for index in self.buckets.get(key, [])}
+        for index in sorted(candidates):
+            similarity = float(np.mean(self.signatures[index] == signature))
+            if similarity >= self.threshold:
+                canonical = self.canonical_chunks[index]
+                self._merge_into(canonical, chunk)
+                self.duplicates += 1
+                return canonical
+
+        index = len(self.canonical_chunks)
+        self.canonical_chunks.append(chunk)
+        self.signatures.append(signature)
+        for key in band_keys:
+            self.buckets[key].append(index)
+        return None
+
+    def deduplicate(self, chunks: List[RuleChunk]) -> List[RuleChunk]:
+        return [chunk for chunk in chunks if self.add(chunk) is None]
+
+    def stats(self) -> Dict[str, Any]:
+        duplicate_ratio = self.duplicates / self.seen if self.seen else 0.0
+        return {
+            "chunks_seen": self.seen,
+            "duplicates_removed": self.duplicates,
+            "duplicate_ratio": duplicate_ratio,
+            "embeddings_saved": self.duplicates,
+            # Expected rerank slots per query that would otherwise go to a redundant copy
+            "rerank_slots_saved": duplicate_ratio * RERANK_TOP_K
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Deduplication: removed {stats['duplicates_removed']} of {stats['chunks_seen']} chunks "
+              f"({stats['duplicate_ratio']:.1%}), saving {stats['embeddings_saved']} embeddings and "
+              f"~{stats['rerank_slots_saved']:.1f} of {RERANK_TOP_K} rerank slots per query")
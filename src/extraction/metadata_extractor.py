@@ -2,38 +2,40 @@ import re
 from typing import Optional
 from src.models.enums import BeltLevel, Federation
 
+# Checked in order; the first keyword found decides the belt level
+BELT_LEVEL_KEYWORDS = [
+    ("white", BeltLevel.WHITE),
+    ("blue", BeltLevel.BLUE),
+    ("purple", BeltLevel.PURPLE),
+    ("brown", BeltLevel.BROWN),
+    ("black", BeltLevel.BLACK),
+    ("master", BeltLevel.MASTER),
+    ("juvenile", BeltLevel.JUVENILE),
+    ("adult", BeltLevel.ADULT),
+]
+
+TECHNIQUES = [
+    "heel hook", "leg lock", "ankle lock", "knee bar", "toe hold", "calf slicer", 
+    "bicep slicer", "neck crank", "spine lock", "guard pull", "takedown", 
+    "mount", "side control", "back control", "closed guard", "open guard"
+]
+
+PAGE_MARKER_PATTERN = re.compile(r"--- Page (\d+) ---")
+
 class MetadataExtractor:
     def extract_belt_level(self, text: str) -> Optional[BeltLevel]:
         text_lower = text.lower()
         
-        if "white" in text_lower:
-            return BeltLevel.WHITE
-        elif "blue" in text_lower:
-            return BeltLevel.BLUE
-        elif "purple" in text_lower:
-            return BeltLevel.PURPLE
-        elif "brown" in text_lower:
-            return BeltLevel.BROWN
-        elif "black" in text_lower:
-            return BeltLevel.BLACK
-        elif "master" in text_lower:
-            return BeltLevel.MASTER
-        elif "juvenile" in text_lower:
-            return BeltLevel.JUVENILE
-        elif "adult" in text_lower:
-            return BeltLevel.ADULT
+        for keyword, belt_level in BELT_LEVEL_KEYWORDS:
+            if keyword in text_lower:
+                return belt_level
         
         return None
     
     def extract_technique_name(self, text: str) -> Optional[str]:
         text_lower = text.lower()
-        techniques = [
-            "heel hook", "leg lock", "ankle lock", "knee bar", "toe hold", "calf slicer", 
-            "bicep slicer", "neck crank", "spine lock", "guard pull", "takedown", 
-            "mount", "side control", "back control", "closed guard", "open guard"
-        ]
         
-        for technique in techniques:
+        for technique in TECHNIQUES:
             if technique in text_lower:
                 return technique.replace(" ", "_")
         return None
@@ -41,7 +43,7 @@ class MetadataExtractor:
     def extract_source_page(self, text: str) -> Optional[int]:
         if "--- Page" in text:
             try:
-                match = re.search(r"--- Page (\d+) ---", text)
+                match = PAGE_MARKER_PATTERN.search(text)
                 if match:
                     return int(match.group(1))
             except:
@@ -0,0 +1,113 @@
+import re
+from typing import Optional
+from pydantic import BaseModel
+from src.models.enums import Category, BeltLevel
+from .content_categorizer import CATEGORY_KEYWORDS
+from .metadata_extractor import BELT_LEVEL_KEYWORDS, TECHNIQUES, PAGE_MARKER_PATTERN
+
+_NO_MATCH = float("inf")
+
+def _trie_branches(terms) -> list:
+    """Factor terms into a prefix trie so the alternation branches once per character."""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Longer continuations are tried before ending, so the longest term at a position wins
+        return "(?:" + body + ")?" if "" in node else body
+
+    return [re.escape(char) + build(child) for char, child in sorted(trie.items())]
+
+class ChunkTags(BaseModel):
+    category: Category
+    belt_level: Optional[BeltLevel] = None
+    technique: Optional[str] = None
+    source_page: Optional[int] = None
+
+class MetadataTagger:
+    """Single-pass replacement for ContentCategorizer plus the MetadataExtractor text scans.
+
+    Every vocabulary term is compiled into one trie-factored alternation, so a single
+    regex scan reports all terms present in a chunk at a cost that barely grows with
+    vocabulary size. Results match the keyword-priority rules of the original
+    extractors exactly.
+    """
+
+    def __init__(self, category_keywords=CATEGORY_KEYWORDS, belt_level_keywords=BELT_LEVEL_KEYWORDS,
+                 techniques=TECHNIQUES):
+        self.categories = [category for category, _ in category_keywords]
+        self.belt_levels = [belt_level for _, belt_level in belt_level_keywords]
+        self.techniques = list(techniques)
+
+        priorities = {}
+
+        def entry(term: str) -> list:
+            return priorities.setdefault(term, [_NO_MATCH, _NO_MATCH, _NO_MATCH])
+
+        for rank, (_, keywords) in enumerate(category_keywords):
+            for keyword in keywords:
+                entry(keyword)[0] = min(entry(keyword)[0], rank)
+        for rank, (keyword, _) in enumerate(belt_level_keywords):
+            entry(keyword)[1] = min(entry(keyword)[1], rank)
+        for rank, technique in enumerate(self.techniques):
+            entry(technique)[2] = min(entry(technique)[2], rank)
+
+        # The scan only reports the longest term starting at each position, so each
+        # term also carries the priorities of every vocabulary term contained in it
+        self.term_priorities = {}
+        for term in priorities:
+            contained = [priorities[other] for other in priorities if other in term]
+            self.term_priorities[term] = tuple(min(priority[i] for priority in contained) for i in range(3))
+
+        # The marker is one more top-level branch; keeping the pattern free of an outer
+        # group lets the regex engine skip positions whose first character cannot match
+        branches = [r"--- page (\d+) ---"] + _trie_branches(priorities)
+        self.pattern = re.compile("|".join(branches))
+
+    def tag(self, text: str) -> ChunkTags:
+        text_lower = text.lower()
+        # Lowercasing a few non-ASCII characters changes the string length, which
+        # would misalign page-marker positions with the original text
+        aligned = len(text_lower) == len(text)
+
+        category_rank = belt_rank = technique_rank = _NO_MATCH
+        source_page = None
+
+        position = 0
+        while True:
+            match = self.pattern.search(text_lower, position)
+            if match is None:
+                break
+            # Resume one character later rather than after the match so overlapping terms are seen too
+            position = match.start() + 1
+
+            page = match.group(1)
+            if page is not None:
+                # Markers are case-sensitive in the original extractor
+                if source_page is None and aligned and text.startswith("--- Page ", match.start()):
+                    source_page = int(page)
+                continue
+
+            term_category, term_belt, term_technique = self.term_priorities[match.group(0)]
+            category_rank = min(category_rank, term_category)
+            belt_rank = min(belt_rank, term_belt)
+            technique_rank = min(technique_rank, term_technique)
+
+        if not aligned and "--- Page" in text:
+            page_match = PAGE_MARKER_PATTERN.search(text)
+            source_page = int(page_match.group(1)) if page_match else None
+
+        return ChunkTags(
+            category=self.categories[category_rank] if category_rank != _NO_MATCH else Category.GENERAL,
+            belt_level=self.belt_levels[belt_rank] if belt_rank != _NO_MATCH else None,
+            technique=self.techniques[technique_rank].replace(" ", "_") if technique_rank != _NO_MATCH else None,
+            source_page=source_page
+        )
@@ -1,48 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List
-from config import ASSETS_DIR
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import uuid
+from config import ASSETS_DIR, CHUNK_CACHE_ENABLED, INGEST_WORKERS, TABLE_ROUTING_ENABLED, DEDUP_ENABLED
 from src.models.rules import RuleChunk
 from src.models.enums import Federation
-from .processing_strategy import FastProcessingStrategy, StructuredProcessingStrategy
+from .processing_strategy import FastProcessingStrategy, StructuredProcessingStrategy, HybridProcessingStrategy
 from .metadata_extractor import MetadataExtractor
+from .chunk_cache import ChunkCache, hash_file
+from .deduplicator import ChunkDeduplicator
+
+def _extract_pdf(strategy_cls, pdf_path: str, federation: Federation, source_file: str) -> Tuple[List[RuleChunk], bool]:
+    # Runs in a worker process, so the strategy is rebuilt there instead of pickling the instance
+    return strategy_cls().process_with_status(pdf_path, federation, source_file)
 
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, use_cache: bool = CHUNK_CACHE_ENABLED, deduplicate: bool = DEDUP_ENABLED):
         self.metadata_extractor = MetadataExtractor()
         self.fast_strategy = FastProcessingStrategy()
         self.structured_strategy = StructuredProcessingStrategy()
-    
+        self.hybrid_strategy = HybridProcessingStrategy()
+        self.chunk_cache = ChunkCache() if use_cache else None
+        self.deduplicate = deduplicate
+
     def _select_strategy(self, filename: str):
         if "Legal_Techniques" in filename or "legal_techniques" in filename.lower():
-            return self.structured_strategy
+            return self.hybrid_strategy if TABLE_ROUTING_ENABLED else self.structured_strategy
         else:
             return self.fast_strategy
-    
-    def process_all_pdfs(self, status_callback=None) -> List[RuleChunk]:
-        all_chunks = []
-        pdf_files = list(Path(ASSETS_DIR).glob("*.pdf"))
-        
+
+    def _report(self, message: str, status_callback=None):
+        if status_callback:
+            status_callback(message)
+        else:
+            print(message)
+
+    def _annotate_chunks(self, chunks: List[RuleChunk], filename: str, content_hash: str) -> List[RuleChunk]:
+        # Chunk IDs only depend on the file contents and position, so they stay stable across re-ingests
+        for i, chunk in enumerate(chunks):
+            metadata = chunk.metadata or {}
+            metadata["source_file"] = filename
+            metadata["content_hash"] = content_hash
+            metadata["chunk_id"] = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{filename}:{content_hash}:{i}"))
+            chunk.metadata = metadata
+        return chunks
+
+    def _lookup_cache(self, pdf_file: Path, strategy, content_hash: str) -> Tuple[Optional[str], Optional[List[RuleChunk]]]:
+        if not self.chunk_cache:
+            return None, None
+
+        cache_key = self.chunk_cache.make_key(content_hash, strategy.__class__.__name__)
+        cached_chunks = self.chunk_cache.get(cache_key)
+        if cached_chunks is not None:
+            print(f"Loaded {len(cached_chunks)} cached chunks for {pdf_file.name}")
+        return cache_key, cached_chunks
+
+    def _store_cache(self, cache_key: Optional[str], chunks: List[RuleChunk], filename: str, degraded: bool = False):
+        # A fallback run is cached under the requested strategy's key, so it would keep
+        # being served after the higher tier becomes available again
+        if degraded:
+            print(f"Warning: Not caching chunks for {filename}, extraction fell back to a lower tier or failed")
+            return
+        if self.chunk_cache and cache_key and chunks:
+            self.chunk_cache.put(cache_key, chunks, source_file=filename)
+
+    def _process_file(self, pdf_file: Path) -> List[RuleChunk]:
+        filename = pdf_file.name
+        federation = self.metadata_extractor.determine_federation(filename)
+        strategy = self._select_strategy(filename)
+        content_hash = hash_file(str(pdf_file))
+
+        cache_key, cached_chunks = self._lookup_cache(pdf_file, strategy, content_hash)
+        if cached_chunks is not None:
+            return self._annotate_chunks(cached_chunks, filename, content_hash)
+
+        print(f"Using {strategy.__class__.__name__} for {filename}")
+        chunks, degraded = strategy.process_with_status(str(pdf_file), federation, filename)
+        chunks = self._annotate_chunks(chunks, filename, content_hash)
+
+        self._store_cache(cache_key, chunks, filename, degraded)
+        return chunks
+
+    def _process_serial(self, pdf_files: List[Path], status_callback=None) -> Iterator[Tuple[int, List[RuleChunk]]]:
+        for i, pdf_file in enumerate(pdf_files):
+            self._report(f"Processing {pdf_file.name}... ({i+1}/{len(pdf_files)})", status_callback)
+            chunks = self._process_file(pdf_file)
+            print(f"Created {len(chunks)} chunks from {pdf_file.name}")
+            yield i, chunks
+
+    def _process_parallel(self, pdf_files: List[Path], max_workers: int, status_callback=None) -> Iterator[Tuple[int, List[RuleChunk]]]:
+        completed = 0
+
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(pdf_files))) as executor:
+            pending = {}
+            for i, pdf_file in enumerate(pdf_files):
+                filename = pdf_file.name
+                strategy = self._select_strategy(filename)
+                content_hash = hash_file(str(pdf_file))
+                cache_key, cached_chunks = self._lookup_cache(pdf_file, strategy, content_hash)
+
+                if cached_chunks is not None:
+                    completed += 1
+                    self._report(f"Processed {filename}... ({completed}/{len(pdf_files)})", status_callback)
+                    yield i, self._annotate_chunks(cached_chunks, filename, content_hash)
+                    continue
+
+                print(f"Using {strategy.__class__.__name__} for {filename}")
+                federation = self.metadata_extractor.determine_federation(filename)
+                future = executor.submit(_extract_pdf, strategy.__class__, str(pdf_file), federation, filename)
+                pending[future] = (i, filename, content_hash, cache_key)
+
+            # Files are yielded in completion order; callers reorder by index when they need to
+            for future in as_completed(pending):
+                i, filename, content_hash, cache_key = pending[future]
+                try:
+                    chunks, degraded = future.result()
+                    chunks = self._annotate_chunks(chunks, filename, content_hash)
+                except Exception as e:
+                    print(f"Error processing {filename} in worker process: {e}")
+                    chunks, degraded = [], True
+
+                self._store_cache(cache_key, chunks, filename, degraded)
+                completed += 1
+                self._report(f"Processed {filename}... ({completed}/{len(pdf_files)})", status_callback)
+                print(f"Created {len(chunks)} chunks from {filename}")
+                yield i, chunks
+
+    def _iter_file_results(self, pdf_files: List[Path], status_callback=None, max_workers: int = None) -> Iterator[Tuple[int, List[RuleChunk]]]:
+        max_workers = max_workers or INGEST_WORKERS
+        if max_workers > 1 and len(pdf_files) > 1:
+            return self._process_parallel(pdf_files, max_workers, status_callback)
+        return self._process_serial(pdf_files, status_callback)
+
+    def _log_cache_stats(self):
+        if self.chunk_cache:
+            stats = self.chunk_cache.stats()
+            print(f"Chunk cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['bytes_read']} bytes read, {stats['bytes_written']} bytes written")
+
+    def _list_pdfs(self) -> List[Path]:
+        pdf_files = sorted(Path(ASSETS_DIR).glob("*.pdf"))
         if not pdf_files:
             print(f"No PDF files found in {ASSETS_DIR}")
+        return pdf_files
+
+    def scan_assets(self) -> Dict[str, str]:
+        return {pdf_file.name: hash_file(str(pdf_file)) for pdf_file in self._list_pdfs()}
+
+    def process_all_pdfs(self, status_callback=None, max_workers: int = None) -> List[RuleChunk]:
+        return self.process_pdfs(self._list_pdfs(), status_callback, max_workers)
+
+    def process_pdfs(self, pdf_files: Iterable, status_callback=None, max_workers: int = None) -> List[RuleChunk]:
+        pdf_files = [Path(ASSETS_DIR) / pdf_file if isinstance(pdf_file, str) else pdf_file for pdf_file in pdf_files]
+        if not pdf_files:
             return []
-        
-        for i, pdf_file in enumerate(pdf_files):
-            filename = pdf_file.name
-            current_status = f"Processing {filename}... ({i+1}/{len(pdf_files)})"
-            
-            if status_callback:
-                status_callback(current_status)
-            else:
-                print(current_status)
-            
-            federation = self.metadata_extractor.determine_federation(filename)
-            strategy = self._select_strategy(filename)
-            
-            print(f"Using {strategy.__class__.__name__} for {filename}")
-            chunks = strategy.process(str(pdf_file), federation, filename)
-            
-            all_chunks.extend(chunks)
-            print(f"Created {len(chunks)} chunks from {filename}")
-        
+
+        file_results = [None] * len(pdf_files)
+        for i, chunks in self._iter_file_results(pdf_files, status_callback, max_workers):
+            file_results[i] = chunks
+
+        all_chunks = [chunk for chunks in file_results for chunk in chunks]
+
         print(f"Created {len(all_chunks)} total chunks")
-        return all_chunks
\ No newline at end of file
+        self._log_cache_stats()
+
+        if self.deduplicate:
+            deduplicator = ChunkDeduplicator()
+            all_chunks = deduplicator.deduplicate(all_chunks)
+            deduplicator.report()
+        return all_chunks
+
+    def iter_chunks(self, status_callback=None, max_workers: int = None) -> Iterator[RuleChunk]:
+        """Yield chunks file by file as extraction finishes, for streaming ingest.
+
+        A chunk may be yielded twice: canonical chunks that gain duplicates from a later file
+        are yielded again at the end, and consumers should upsert by chunk ID.
+        """
+        pdf_files = self._list_pdfs()
+        deduplicator = ChunkDeduplicator() if self.deduplicate else None
+        total_chunks = 0
+        yielded = set()
+        # Canonical chunks from earlier files that picked up duplicate_sources after being yielded
+        updated: Dict[str, RuleChunk] = {}
+
+        for _, chunks in self._iter_file_results(pdf_files, status_callback, max_workers):
+            total_chunks += len(chunks)
+            if deduplicator:
+                kept = []
+                for chunk in chunks:
+                    canonical = deduplicator.add(chunk)
+                    if canonical is None:
+                        kept.append(chunk)
+                    elif canonical.metadata["chunk_id"] in yielded:
+                        updated[canonical.metadata["chunk_id"]] = canonical
+                chunks = kept
+                yielded.update(chunk.metadata["chunk_id"] for chunk in chunks)
+            yield from chunks
+
+        # Yielded again under the same chunk ID, so the indexed payload ends up with every duplicate source
+        yield from updated.values()
+
+        print(f"Created {total_chunks} total chunks")
+        self._log_cache_stats()
+        if deduplicator:
+            deduplicator.report()
+
+    def invalidate_cache(self) -> int:
+        if not self.chunk_cache:
+            return 0
+        removed = self.chunk_cache.invalidate()
+        print(f"Removed {removed} chunk cache entries")
+        return removed
\ No newline at end of file
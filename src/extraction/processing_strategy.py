@@ -1,12 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import List
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
 from src.models.rules import RuleChunk
 from src.models.enums import Federation
-from .text_extractor import TextExtractor, FastTextExtractor, StructuredExtractor
-from .content_categorizer import ContentCategorizer
-from .metadata_extractor import MetadataExtractor
+from .text_extractor import TextExtractor, FastTextExtractor, StructuredExtractor, HybridExtractor
+from .metadata_tagger import MetadataTagger
+from .streaming_splitter import StreamingTextSplitter
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from config import CHUNK_SIZE, CHUNK_OVERLAP, MEMORY_BOUNDED_EXTRACTION
+
+CHUNK_SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
 
 class ProcessingStrategy(ABC):
     def __init__(self):
@@ -14,10 +17,11 @@ class ProcessingStrategy(ABC):
             chunk_size=CHUNK_SIZE,
             chunk_overlap=CHUNK_OVERLAP,
             length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
+            separators=CHUNK_SEPARATORS,
+            add_start_index=True
         )
-        self.categorizer = ContentCategorizer()
-        self.metadata_extractor = MetadataExtractor()
+        self.streaming_splitter = StreamingTextSplitter(CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_SEPARATORS)
+        self.tagger = MetadataTagger()
     
     @abstractmethod
     def get_extractor(self) -> TextExtractor:
@@ -32,40 +36,117 @@ class ProcessingStrategy(ABC):
         return text.strip()
     
     def process(self, pdf_path: str, federation: Federation, source_file: str) -> List[RuleChunk]:
+        return self.process_with_status(pdf_path, federation, source_file)[0]
+    
+    def process_with_status(self, pdf_path: str, federation: Federation,
+                            source_file: str) -> Tuple[List[RuleChunk], bool]:
+        """Return the chunks and whether the extractor fell back to a lower tier or failed on the way."""
         extractor = self.get_extractor()
+        # Sharded extraction already works on whole page ranges, so it keeps the in-memory path
+        if MEMORY_BOUNDED_EXTRACTION and extractor.shard_workers <= 1:
+            chunks = list(self.iter_process(pdf_path, federation, source_file, extractor))
+            return chunks, extractor.degraded
+        
         content_data = extractor.extract(pdf_path)
         
         if not content_data['text'] or len(content_data['text'].strip()) < 50:
             print(f"Warning: Little/no content extracted from {source_file}")
-            return []
+            return [], extractor.degraded
         
-        return self._create_chunks(content_data['text'], federation, source_file)
+        return self._create_chunks(
+            content_data['text'],
+            federation,
+            source_file,
+            content_data.get('page_offsets'),
+            content_data.get('page_numbers')
+        ), extractor.degraded
     
-    def _create_chunks(self, text: str, federation: Federation, source_file: str) -> List[RuleChunk]:
-        raw_chunks = self.text_splitter.split_text(text)
-        processed_chunks = []
+    def iter_process(self, pdf_path: str, federation: Federation, source_file: str,
+                     extractor: TextExtractor = None) -> Iterator[RuleChunk]:
+        """Extract and chunk page by page, never holding the whole document text in memory."""
+        extractor = extractor or self.get_extractor()
+        page_offsets = []
+        page_numbers = []
+        extracted = {"characters": 0, "head": ""}
+        
+        def segment_texts() -> Iterator[str]:
+            # Page offsets are recorded as segments stream past, ahead of the chunks that need them
+            for page_number, text, _ in extractor.iter_segments(pdf_path):
+                if page_number is not None and (not page_numbers or page_numbers[-1] != page_number):
+                    page_offsets.append(extracted["characters"])
+                    page_numbers.append(page_number)
+                extracted["characters"] += len(text)
+                if len(extracted["head"].strip()) < 50:
+                    extracted["head"] += text
+                yield text
         
-        for chunk in raw_chunks:
-            cleaned_chunk = self.clean_text(chunk)
-            
-            if not cleaned_chunk.strip() or len(cleaned_chunk.strip()) < 30:
+        # Chunks are held back until the document has shown at least 50 non-blank characters,
+        # so near-empty extractions are rejected as a whole like on the in-memory path
+        pending = []
+        for start, chunk in self.streaming_splitter.split_segments(segment_texts()):
+            rule_chunk = self._build_chunk(chunk, start, federation, source_file, page_offsets, page_numbers)
+            if not rule_chunk:
                 continue
-            
-            category = self.categorizer.categorize_content(cleaned_chunk)
-            belt_level = self.metadata_extractor.extract_belt_level(cleaned_chunk)
-            technique = self.metadata_extractor.extract_technique_name(cleaned_chunk)
-            source_page = self.metadata_extractor.extract_source_page(cleaned_chunk)
-            
-            rule_chunk = RuleChunk(
-                content=cleaned_chunk,
-                federation=federation,
-                category=category,
-                belt_level=belt_level,
-                technique=technique,
-                source_page=source_page,
-                metadata={"source_file": source_file}
+            if len(extracted["head"].strip()) < 50:
+                pending.append(rule_chunk)
+                continue
+            yield from pending
+            pending = []
+            yield rule_chunk
+        
+        if len(extracted["head"].strip()) < 50:
+            print(f"Warning: Little/no content extracted from {source_file}")
+            return
+        yield from pending
+    
+    def _resolve_page_span(self, start: int, length: int, page_offsets: List[int],
+                           page_numbers: List[int]) -> Tuple[Optional[int], Optional[int]]:
+        if not page_offsets or start < 0:
+            return None, None
+        
+        first = bisect_right(page_offsets, start) - 1
+        last = bisect_right(page_offsets, start + max(length - 1, 0)) - 1
+        if last < 0:
+            return None, None
+        return page_numbers[max(first, 0)], page_numbers[last]
+    
+    def _build_chunk(self, chunk: str, start: int, federation: Federation, source_file: str,
+                     page_offsets: List[int] = None, page_numbers: List[int] = None) -> Optional[RuleChunk]:
+        cleaned_chunk = self.clean_text(chunk)
+        
+        if not cleaned_chunk.strip() or len(cleaned_chunk.strip()) < 30:
+            return None
+        
+        tags = self.tagger.tag(cleaned_chunk)
+        first_page, last_page = self._resolve_page_span(start, len(chunk), page_offsets, page_numbers)
+        
+        return RuleChunk(
+            content=cleaned_chunk,
+            federation=federation,
+            category=tags.category,
+            belt_level=tags.belt_level,
+            technique=tags.technique,
+            # Fall back to an in-chunk page marker when the extractor gave no page index
+            source_page=first_page if first_page is not None else tags.source_page,
+            metadata={"source_file": source_file, "page_end": last_page or tags.source_page}
+        )
+    
+    def _create_chunks(self, text: str, federation: Federation, source_file: str,
+                       page_offsets: List[int] = None, page_numbers: List[int] = None) -> List[RuleChunk]:
+        raw_chunks = self.text_splitter.create_documents([text])
+        processed_chunks = []
+        
+        for raw_chunk in raw_chunks:
+            rule_chunk = self._build_chunk(
+                raw_chunk.page_content,
+                raw_chunk.metadata.get("start_index", -1),
+                federation,
+                source_file,
+                page_offsets,
+                page_numbers
             )
-            processed_chunks.append(rule_chunk)
+            if rule_chunk:
+                processed_chunks.append(rule_chunk)
         
         return processed_chunks
 
@@ -75,4 +156,8 @@ class FastProcessingStrategy(ProcessingStrategy):
 
 class StructuredProcessingStrategy(ProcessingStrategy):
     def get_extractor(self) -> TextExtractor:
-        return StructuredExtractor()
\ No newline at end of file
+        return StructuredExtractor()
+
+class HybridProcessingStrategy(ProcessingStrategy):
+    def get_extractor(self) -> TextExtractor:
+        return HybridExtractor()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import re
+from collections import deque
+from typing import Iterable, Iterator, List, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+class StreamingTextSplitter:
+    """Splits an iterable of text segments without joining them into one document string.
+
+    Emits exactly the chunks and start offsets of RecursiveCharacterTextSplitter.create_documents
+    on the whole document. Once the first separator has appeared it is the top-level separator
+    of the whole document, so every top-level split that a later separator closes is final. Such
+    splits are merged greedily as they complete, with the same rules as the library's merge
+    step, and splits longer than chunk_size are handed to a splitter over the remaining
+    separators. Only the open split, the merge window and the overlap needed to locate the next
+    chunk stay buffered. A document that never contains the first separator is split whole.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, separators: List[str]):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separator = separators[0]
+        self.full_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators, add_start_index=True
+        )
+        self.long_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators[1:]
+        ) if len(separators) > 1 else None
+
+    @staticmethod
+    def _join(current: deque) -> str:
+        return "".join(split for _, split in current).strip()
+
+    def _merge(self, current: deque, total: List[int], start: int, split: str) -> Iterator[str]:
+        # Mirrors TextSplitter._merge_splits for separators kept on the splits (a "" join);
+        # the window holds (absolute start, split) pairs so the caller knows what text is still needed
+        if total[0] + len(split) > self.chunk_size and current:
+            chunk = self._join(current)
+            if chunk:
+                yield chunk
+            while total[0] > self.chunk_overlap or (total[0] + len(split) > self.chunk_size and total[0] > 0):
+                total[0] -= len(current.popleft()[1])
+        current.append((start, split))
+        total[0] += len(split)
+
+    def _flush(self, current: deque, total: List[int]) -> Iterator[str]:
+        chunk = self._join(current)
+        current.clear()
+        total[0] = 0
+        if chunk:
+            yield chunk
+
+    def _split(self, start: int, split: str, current: deque, total: List[int]) -> Iterator[str]:
+        if len(split) < self.chunk_size:
+            yield from self._merge(current, total, start, split)
+            return
+        yield from self._flush(current, total)
+        if self.long_splitter:
+            yield from self.long_splitter.split_text(split)
+        else:
+            yield split
+
+    def split_segments(self, segments: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """Yield (absolute start offset, chunk text) pairs in document order."""
+        if not self.separator:
+            yield from self._split_whole("".join(segments))
+            return
+
+        pattern = re.compile(re.escape(self.separator))
+        text = ""
+        # Absolute offset of text[0], and where the still-open top-level split starts within text
+        base = 0
+        open_split = 0
+        separator_seen = False
+        current, total = deque(), [0]
+        # create_documents locates each chunk with text.find from just before the previous one's end
+        located = {"index": 0, "length": 0}
+
+        def locate(chunk: str) -> Tuple[int, str]:
+            offset = max(0, located["index"] + located["length"] - self.chunk_overlap)
+            position = text.find(chunk, max(0, offset - base))
+            located["index"] = base + position if position >= 0 else -1
+            located["length"] = len(chunk)
+            return located["index"], chunk
+
+        for segment in segments:
+            text += segment
+            if not separator_seen:
+                if self.separator not in text:
+                    continue
+                separator_seen = True
+
+            starts = [match.start() for match in pattern.finditer(text, open_split)]
+            boundaries = [open_split] + [start for start in starts if start > open_split]
+            for split_start, split_end in zip(boundaries, boundaries[1:]):
+                for chunk in self._split(base + split_start, text[split_start:split_end], current, total):
+                    yield locate(chunk)
+            open_split = boundaries[-1]
+
+            # Keep the open split, every split still in the merge window and whatever the next
+            # find() may still need to look at
+            needed = [base + open_split, max(0, located["index"] + located["length"] - self.chunk_overlap)]
+            if current:
+                needed.append(current[0][0])
+            keep = max(0, min(needed) - base)
+            text = text[keep:]
+            base += keep
+            open_split -= keep
+
+        if not separator_seen:
+            yield from self._split_whole(text)
+            return
+
+        if text[open_split:]:
+            for chunk in self._split(base + open_split, text[open_split:], current, total):
+                yield locate(chunk)
+        for chunk in self._flush(current, total):
+            yield locate(chunk)
+
+    def _split_whole(self, text: str) -> Iterator[Tuple[int, str]]:
+        for document in self.full_splitter.create_documents([text]):
+            yield document.metadata.get("start_index", 0), document.page_content
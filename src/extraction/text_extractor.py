@@ -1,88 +1,291 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import os
+import re
+import tempfile
 import PyPDF2
+from PyPDF2.generic import ArrayObject
 from unstructured.partition.pdf import partition_pdf
+from config import (
+    EXTRACTION_SHARD_WORKERS, PAGES_PER_SHARD,
+    TABLE_MIN_RULING_OPS, TABLE_COLUMNAR_LINE_RATIO
+)
+
+# (page_number, text, table) pieces of a document, in reading order
+Segment = Tuple[Optional[int], str, Optional[Dict[str, Any]]]
+
+def _extract_shard(extractor_cls, pdf_path: str, start_page: int, end_page: int) -> Dict[str, Any]:
+    return extractor_cls().extract_pages(pdf_path, start_page, end_page)
 
 class TextExtractor(ABC):
-    @abstractmethod
+    def __init__(self, shard_workers: int = EXTRACTION_SHARD_WORKERS, pages_per_shard: int = PAGES_PER_SHARD):
+        self.shard_workers = shard_workers
+        self.pages_per_shard = pages_per_shard
+        # Set when extraction fell back to a lower tier or failed part way, so the output
+        # is usable but must not be cached as this extractor's result
+        self.degraded = False
+
     def extract(self, pdf_path: str) -> Dict[str, Any]:
+        if self.shard_workers > 1:
+            return self.extract_sharded(pdf_path)
+        return self.extract_pages(pdf_path)
+
+    @abstractmethod
+    def iter_segments(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Iterator[Segment]:
+        """Yield segments for the zero-based, end-exclusive page range [start_page, end_page)."""
         pass
 
+    def extract_pages(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Dict[str, Any]:
+        result = self.collect_segments(self.iter_segments(pdf_path, start_page, end_page))
+        result['degraded'] = self.degraded
+        return result
+
+    @staticmethod
+    def collect_segments(segments: Iterable[Segment]) -> Dict[str, Any]:
+        text_parts = []
+        tables = []
+        # Sorted character offsets where each page starts, for bisect page lookups
+        page_offsets = []
+        page_numbers = []
+        length = 0
+
+        for page_number, text, table in segments:
+            if page_number is not None and (not page_numbers or page_numbers[-1] != page_number):
+                page_offsets.append(length)
+                page_numbers.append(page_number)
+            if table:
+                tables.append(table)
+            text_parts.append(text)
+            length += len(text)
+
+        return {
+            'text': "".join(text_parts),
+            'tables': tables,
+            'page_offsets': page_offsets,
+            'page_numbers': page_numbers
+        }
+
+    def count_pages(self, pdf_path: str) -> int:
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        return [
+            (start, min(start + self.pages_per_shard, page_count))
+            for start in range(0, page_count, self.pages_per_shard)
+        ]
+
+    def extract_sharded(self, pdf_path: str) -> Dict[str, Any]:
+        try:
+            ranges = self.page_ranges(self.count_pages(pdf_path))
+        except Exception as e:
+            print(f"Error counting pages in {pdf_path}, extracting without sharding: {e}")
+            return self.extract_pages(pdf_path)
+
+        if len(ranges) <= 1:
+            return self.extract_pages(pdf_path)
+
+        print(f"Extracting {pdf_path} in {len(ranges)} page shards")
+        with ProcessPoolExecutor(max_workers=min(self.shard_workers, len(ranges))) as executor:
+            futures = [
+                executor.submit(_extract_shard, self.__class__, pdf_path, start, end)
+                for start, end in ranges
+            ]
+            result = self.merge_results([future.result() for future in futures])
+        self.degraded = result['degraded']
+        return result
+
+    @staticmethod
+    def merge_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Shards carry absolute page numbers, so merging in range order is concatenation
+        # plus shifting each shard's page offsets by the text that precedes it
+        page_offsets = []
+        page_numbers = []
+        base_offset = 0
+        for result in results:
+            page_offsets.extend(base_offset + offset for offset in result.get('page_offsets', []))
+            page_numbers.extend(result.get('page_numbers', []))
+            base_offset += len(result['text'])
+
+        return {
+            'text': "".join(result['text'] for result in results),
+            'tables': [table for result in results for table in result['tables']],
+            'page_offsets': page_offsets,
+            'page_numbers': page_numbers,
+            'degraded': any(result.get('degraded', False) for result in results)
+        }
+
 class FastTextExtractor(TextExtractor):
-    def extract(self, pdf_path: str) -> Dict[str, Any]:
+    def iter_segments(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Iterator[Segment]:
         try:
             with open(pdf_path, 'rb') as file:
                 reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page_num, page in enumerate(reader.pages):
+                for page_num, page in enumerate(reader.pages[start_page:end_page], start=start_page):
                     page_text = page.extract_text()
                     if page_text.strip():
-                        text += f"\n--- Page {page_num + 1} ---\n{page_text}\n"
-                return {'text': text, 'tables': []}
+                        yield page_num + 1, f"\n--- Page {page_num + 1} ---\n{page_text}\n", None
         except Exception as e:
+            self.degraded = True
             print(f"Error extracting text from {pdf_path}: {e}")
-            return {'text': "", 'tables': []}
 
 class StructuredExtractor(TextExtractor):
     def _clean_table_text(self, table_text: str) -> str:
         if not table_text:
             return ""
-        
+
         lines = table_text.split('\n')
         cleaned_lines = []
-        
+
         for line in lines:
             line = line.strip()
             if line and not line in ['|', '|-', '+', '-']:
                 line = ' '.join(line.split())
                 cleaned_lines.append(line)
-        
+
         cleaned_text = '\n'.join(cleaned_lines)
         cleaned_text = cleaned_text.replace('|', ' ')
         cleaned_text = cleaned_text.replace('+', '')
         cleaned_text = cleaned_text.replace('-', '')
         cleaned_text = ' '.join(cleaned_text.split())
-        
+
         return cleaned_text
-    
-    def extract(self, pdf_path: str) -> Dict[str, Any]:
+
+    def _write_page_subset(self, pdf_path: str, start_page: int, end_page: int) -> str:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            writer = PyPDF2.PdfWriter()
+            for page in reader.pages[start_page:end_page]:
+                writer.add_page(page)
+
+            handle, subset_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(handle, 'wb') as subset_file:
+                writer.write(subset_file)
+        return subset_path
+
+    def iter_segments(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Iterator[Segment]:
+        is_subset = start_page > 0 or end_page is not None
+        subset_path = None
         try:
+            if is_subset:
+                subset_path = self._write_page_subset(pdf_path, start_page, end_page)
+
             elements = partition_pdf(
-                filename=pdf_path,
+                filename=subset_path or pdf_path,
                 strategy="hi_res",
                 infer_table_structure=True,
                 extract_images_in_pdf=False
             )
-            
-            text_content = ""
-            tables = []
-            
-            for element in elements:
-                element_type = str(type(element).__name__)
-                
-                if element_type == 'Table':
-                    table_text = element.text
-                    page_number = None
-                    
-                    if hasattr(element, 'metadata') and element.metadata:
-                        if hasattr(element.metadata, 'page_number'):
-                            page_number = element.metadata.page_number
-                    
-                    if table_text and len(table_text.strip()) > 20:
-                        cleaned_table = self._clean_table_text(table_text)
-                        tables.append({
-                            'text': cleaned_table,
-                            'page_number': page_number
-                        })
-                        text_content += f"\n{cleaned_table}\n"
-                else:
-                    text_content += element.text + "\n"
-            
-            return {'text': text_content, 'tables': tables}
         except Exception as e:
             print(f"Error processing {pdf_path} with structured extraction: {e}")
-            return self._fallback_extract(pdf_path)
-    
-    def _fallback_extract(self, pdf_path: str) -> Dict[str, Any]:
+            self.degraded = True
+            yield from self._fallback_segments(pdf_path, start_page, end_page)
+            return
+        finally:
+            if subset_path:
+                os.unlink(subset_path)
+
+        for element in elements:
+            element_type = str(type(element).__name__)
+            page_number = None
+
+            if hasattr(element, 'metadata') and element.metadata:
+                if hasattr(element.metadata, 'page_number'):
+                    page_number = element.metadata.page_number
+
+            # Page numbers inside a subset PDF restart at 1
+            if page_number is not None:
+                page_number += start_page
+
+            if element_type == 'Table':
+                table_text = element.text
+
+                if table_text and len(table_text.strip()) > 20:
+                    cleaned_table = self._clean_table_text(table_text)
+                    table = {
+                        'text': cleaned_table,
+                        'page_number': page_number
+                    }
+                    yield page_number, f"\n{cleaned_table}\n", table
+            else:
+                yield page_number, element.text + "\n", None
+
+    def _fallback_segments(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Iterator[Segment]:
         fallback_extractor = FastTextExtractor()
-        return fallback_extractor.extract(pdf_path)
\ No newline at end of file
+        return fallback_extractor.iter_segments(pdf_path, start_page, end_page)
+
+class HybridExtractor(TextExtractor):
+    """Pre-scans pages with PyPDF2 and sends only table-like pages through hi_res partitioning."""
+
+    RULING_OPERATOR_PATTERN = re.compile(rb"\s(?:re|l)\s")
+    COLUMN_GAP_PATTERN = re.compile(r"\s{2,}|\t")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.structured_extractor = StructuredExtractor(shard_workers=1)
+
+    @staticmethod
+    def _content_bytes(page) -> bytes:
+        # PyPDF2 3.0 returns the raw /Contents object: a single stream, or an ArrayObject of
+        # streams when the page splits its content. Later releases merge both into a ContentStream
+        contents = page.get_contents()
+        if contents is None:
+            return b""
+        if isinstance(contents, ArrayObject):
+            # Streams are joined on a newline so an operator at a stream boundary still matches
+            return b"\n".join(stream.get_object().get_data() for stream in contents)
+        return contents.get_data()
+
+    def _looks_like_table(self, page, page_text: str) -> bool:
+        # Ruled tables draw cell borders as rectangle/line operators in the content stream
+        try:
+            data = self._content_bytes(page)
+        except Exception:
+            data = b""
+        if len(self.RULING_OPERATOR_PATTERN.findall(data)) >= TABLE_MIN_RULING_OPS:
+            return True
+
+        lines = [line.strip() for line in page_text.splitlines() if line.strip()]
+        if not lines:
+            return False
+        columnar_lines = sum(1 for line in lines if len(self.COLUMN_GAP_PATTERN.split(line)) >= 3)
+        return columnar_lines / len(lines) >= TABLE_COLUMNAR_LINE_RATIO
+
+    def _structured_run(self, pdf_path: str, start_page: int, end_page: int) -> Iterator[Segment]:
+        yield start_page + 1, f"\n--- Page {start_page + 1} ---\n", None
+        yield from self.structured_extractor.iter_segments(pdf_path, start_page, end_page)
+        self.degraded = self.degraded or self.structured_extractor.degraded
+
+    def iter_segments(self, pdf_path: str, start_page: int = 0, end_page: int = None) -> Iterator[Segment]:
+        with open(pdf_path, 'rb') as file:
+            try:
+                reader = PyPDF2.PdfReader(file)
+            except Exception as e:
+                print(f"Error pre-scanning {pdf_path}, using structured extraction: {e}")
+                yield from self.structured_extractor.iter_segments(pdf_path, start_page, end_page)
+                self.degraded = self.degraded or self.structured_extractor.degraded
+                return
+
+            # Pages are scanned lazily; contiguous table pages are batched into one partition call
+            table_run_start = None
+            table_pages = 0
+            scanned_pages = 0
+            for page_num, page in enumerate(reader.pages[start_page:end_page], start=start_page):
+                page_text = page.extract_text() or ""
+                scanned_pages += 1
+                if self._looks_like_table(page, page_text):
+                    table_pages += 1
+                    if table_run_start is None:
+                        table_run_start = page_num
+                    continue
+
+                if table_run_start is not None:
+                    yield from self._structured_run(pdf_path, table_run_start, page_num)
+                    table_run_start = None
+                if page_text.strip():
+                    yield page_num + 1, f"\n--- Page {page_num + 1} ---\n{page_text}\n", None
+
+            if table_run_start is not None:
+                yield from self._structured_run(pdf_path, table_run_start, start_page + scanned_pages)
+
+        print(f"Routed {table_pages}/{scanned_pages} pages of {pdf_path} through hi_res partitioning")
\ No newline at end of file
@@ -0,0 +1,691 @@
+import json
+import re
+import numpy as np
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Union, Callable
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient, models
+import shutil
+import tempfile
+from config import COLLECTION_NAME, SHORTLIST_DIMENSIONS, SHORTLIST_INT8, RESCORE_CANDIDATES, QDRANT_URL, QDRANT_API_KEY
+
+SearchResults = List[List[Tuple[Document, float]]]
+
+# One value, or several alternatives that a field may match
+FilterValue = Union[str, List[str], Tuple[str, ...], None]
+
+# Metadata fields that get keyword payload indexes and can be filtered on
+FILTER_FIELDS = ("federation", "category", "belt_level", "technique")
+
+# Qdrant payload layout, kept identical to what langchain's Qdrant store writes so older indexes still open
+CONTENT_KEY = "page_content"
+METADATA_KEY = "metadata"
+
+def plain_value(value):
+    """Store enum members as their plain string value so payloads never hold Python objects."""
+    return getattr(value, "value", value)
+
+def filter_values(value: FilterValue) -> List[str]:
+    """Normalise a filter value, or a collection of alternatives, to a list of plain strings."""
+    values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+    return [str(plain_value(item)) for item in values if item is not None]
+
+class VectorBackend(ABC):
+    """Stores embedded chunk documents and answers filtered cosine-similarity searches."""
+
+    @property
+    @abstractmethod
+    def ready(self) -> bool:
+        pass
+
+    @abstractmethod
+    def open(self) -> bool:
+        """Open previously persisted vectors; returns False when there is nothing to open."""
+        pass
+
+    @abstractmethod
+    def create(self, vector_size: int):
+        pass
+
+    @abstractmethod
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        pass
+
+    @abstractmethod
+    def delete_source_files(self, source_files: List[str]):
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @abstractmethod
+    def search(self, vectors: List[List[float]], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        """Return the top `limit` (document, score) pairs for each query vector."""
+        pass
+
+    def flush(self):
+        """Persist pending writes; backends that write through need not override this."""
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+class QdrantBackend(VectorBackend):
+    def __init__(self, path: str = None, url: str = QDRANT_URL, api_key: str = QDRANT_API_KEY,
+                 collection_name: str = COLLECTION_NAME):
+        self.path = path
+        self.url = url
+        self.api_key = api_key
+        self.collection_name = collection_name
+        self.client = None
+        self.attached = False
+
+    @property
+    def ready(self) -> bool:
+        return self.attached
+
+    def _connect(self):
+        if self.client is None:
+            if self.url:
+                self.client = QdrantClient(url=self.url, api_key=self.api_key)
+            elif self.path:
+                self.client = QdrantClient(path=self.path)
+            else:
+                self.client = QdrantClient(location=":memory:")
+
+    def _create_payload_indexes(self):
+        # The local engine ignores payload indexes, so they are only created on a server
+        if not self.url:
+            return
+        for field in FILTER_FIELDS:
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=f"{METADATA_KEY}.{field}",
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
+
+    def open(self) -> bool:
+        self._connect()
+        if not self.client.collection_exists(self.collection_name):
+            self.close()
+            return False
+        self._create_payload_indexes()
+        self.attached = True
+        return True
+
+    def create(self, vector_size: int):
+        self._connect()
+        # A server keeps collections across runs, so a rebuild starts from an empty one
+        if self.client.collection_exists(self.collection_name):
+            self.client.delete_collection(self.collection_name)
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE)
+        )
+        self._create_payload_indexes()
+        self.attached = True
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                models.PointStruct(
+                    id=point_id,
+                    vector=vector,
+                    payload={CONTENT_KEY: doc.page_content, METADATA_KEY: doc.metadata}
+                )
+                for point_id, vector, doc in zip(ids, vectors, documents)
+            ]
+        )
+
+    def delete_source_files(self, source_files: List[str]):
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key=f"{METADATA_KEY}.source_file",
+                            match=models.MatchAny(any=source_files)
+                        )
+                    ]
+                )
+            )
+        )
+
+    def count(self) -> int:
+        return self.client.count(collection_name=self.collection_name).count
+
+    @staticmethod
+    def _native_filter(filter_dict: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        if not filter_dict:
+            return None
+
+        conditions = []
+        for field, value in filter_dict.items():
+            values = filter_values(value)
+            # Several values for one field are alternatives (OR); separate fields must all match
+            match = models.MatchValue(value=values[0]) if len(values) == 1 else models.MatchAny(any=values)
+            conditions.append(models.FieldCondition(key=f"{METADATA_KEY}.{field}", match=match))
+        return models.Filter(must=conditions)
+
+    def search(self, vectors: List[List[float]], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        query_filter = self._native_filter(filter_dict)
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(query=vector, filter=query_filter, limit=limit, with_payload=True)
+                for vector in vectors
+            ]
+        )
+        return [
+            [
+                (
+                    Document(
+                        page_content=point.payload.get(CONTENT_KEY) or "",
+                        metadata=point.payload.get(METADATA_KEY) or {}
+                    ),
+                    point.score
+                )
+                for point in response.points
+            ]
+            for response in responses
+        ]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = None
+        self.attached = False
+
+class NumpyBackend(VectorBackend):
+    """Exact search over one contiguous matrix of L2-normalised float32 vectors.
+
+    The filterable metadata fields are dictionary-encoded into integer columns so filters
+    become vectorised boolean masks. Persisted as vectors.npy plus documents.json.
+    """
+
+    FILTER_FIELDS = FILTER_FIELDS
+
+    def __init__(self, path: str = None):
+        self.path = Path(path) if path else None
+        self.matrix: Optional[np.ndarray] = None
+        self.size = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.documents: List[Document] = []
+        self.codes: Dict[str, Dict[str, int]] = {field: {} for field in self.FILTER_FIELDS}
+        self.columns: Dict[str, np.ndarray] = {}
+        self.matrix_dtype = np.float32
+        self.dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return self.matrix is not None
+
+    def _encode(self, field: str, value) -> int:
+        if value is None:
+            return -1
+        return self.codes[field].setdefault(str(plain_value(value)), len(self.codes[field]))
+
+    def _reserve(self, rows: int):
+        # Capacity doubles so streamed upserts stay amortised O(1) per row
+        capacity = self.matrix.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 1024)
+        matrix = np.zeros((new_capacity, self.matrix.shape[1]), dtype=self.matrix_dtype)
+        matrix[:self.size] = self.matrix[:self.size]
+        self.matrix = matrix
+        for field in self.FILTER_FIELDS:
+            column = np.full(new_capacity, -1, dtype=np.int32)
+            column[:self.size] = self.columns[field][:self.size]
+            self.columns[field] = column
+
+    @staticmethod
+    def _normalise(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.npy"
+
+    def _documents_path(self) -> Path:
+        return self.path / "documents.json"
+
+    def open(self) -> bool:
+        if not self.path or not self._vectors_path().exists() or not self._documents_path().exists():
+            return False
+
+        stored = json.loads(self._documents_path().read_text())
+        vectors = np.load(self._vectors_path())
+        self._reset(vectors.shape[1])
+        self._reserve(len(vectors))
+        self.matrix[:len(vectors)] = vectors
+        for i, item in enumerate(stored["documents"]):
+            self._set_row(i, item["id"], Document(page_content=item["page_content"], metadata=item["metadata"]))
+        self.size = len(vectors)
+        self.dirty = False
+        return True
+
+    def create(self, vector_size: int):
+        self._reset(vector_size)
+
+    def _reset(self, width: int):
+        self.matrix = np.zeros((0, width), dtype=self.matrix_dtype)
+        self.columns = {field: np.zeros(0, dtype=np.int32) for field in self.FILTER_FIELDS}
+        self.size = 0
+        self.ids = []
+        self.rows = {}
+        self.documents = []
+        self.codes = {field: {} for field in self.FILTER_FIELDS}
+        self.dirty = True
+
+    def _set_row(self, row: int, point_id: str, document: Document):
+        if row == len(self.ids):
+            self.ids.append(point_id)
+            self.documents.append(document)
+        else:
+            self.ids[row] = point_id
+            self.documents[row] = document
+        self.rows[point_id] = row
+        for field in self.FILTER_FIELDS:
+            self.columns[field][row] = self._encode(field, document.metadata.get(field))
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        self._reserve(self.size + len(ids))
+        rows = []
+        for point_id, document in zip(ids, documents):
+            # Store plain JSON-compatible metadata, as a Qdrant payload round trip would
+            document = Document(page_content=document.page_content, metadata=json.loads(json.dumps(document.metadata)))
+            row = self.rows.get(point_id)
+            if row is None:
+                row = self.size
+                self.size += 1
+            self._set_row(row, point_id, document)
+            rows.append(row)
+        self._store_vectors(np.array(rows, dtype=np.int64), self._normalise(vectors))
+        self.dirty = True
+
+    def _store_vectors(self, rows: np.ndarray, normalised: np.ndarray):
+        self.matrix[rows] = normalised
+
+    def _keep_vectors(self, kept_rows: np.ndarray):
+        self.matrix = np.ascontiguousarray(self.matrix[:self.size][kept_rows])
+
+    def delete_source_files(self, source_files: List[str]):
+        stale = set(source_files)
+        keep = np.array([doc.metadata.get("source_file") not in stale for doc in self.documents], dtype=bool)
+        kept_rows = np.flatnonzero(keep)
+
+        self._keep_vectors(kept_rows)
+        self.columns = {field: column[:self.size][kept_rows] for field, column in self.columns.items()}
+        self.ids = [self.ids[row] for row in kept_rows]
+        self.documents = [self.documents[row] for row in kept_rows]
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.size = len(self.ids)
+        self.dirty = True
+
+    def count(self) -> int:
+        return self.size
+
+    def _mask(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filter_dict:
+            return None
+
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in filter_dict.items():
+            if field not in self.codes:
+                raise ValueError(f"NumpyBackend cannot filter on '{field}'; supported fields: {self.FILTER_FIELDS}")
+            codes = [self.codes[field][item] for item in filter_values(value) if item in self.codes[field]]
+            if not codes:
+                return np.zeros(self.size, dtype=bool)
+            column = self.columns[field][:self.size]
+            mask &= column == codes[0] if len(codes) == 1 else np.isin(column, codes)
+        return mask
+
+    def search(self, vectors: List[List[float]], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        mask = self._mask(filter_dict)
+        matches = self.size if mask is None else int(mask.sum())
+        k = min(limit, matches)
+        if k <= 0:
+            return [[] for _ in vectors]
+
+        # One matrix product scores every query; filtered-out rows are pushed below any real score
+        scores = self._normalise(vectors) @ self.matrix[:self.size].T
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+
+        return [
+            [(self.documents[row], float(query_scores[row])) for row in self._top_rows(query_scores, k)]
+            for query_scores in scores
+        ]
+
+    @staticmethod
+    def _top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def flush(self):
+        if not self.path or not self.dirty or self.matrix is None:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = self.path / "vectors.tmp.npy"
+        np.save(tmp_vectors, self.matrix[:self.size])
+        tmp_vectors.replace(self._vectors_path())
+
+        tmp_documents = self._documents_path().with_suffix(".tmp")
+        tmp_documents.write_text(json.dumps({
+            "documents": [
+                {"id": point_id, "page_content": doc.page_content, "metadata": doc.metadata}
+                for point_id, doc in zip(self.ids, self.documents)
+            ]
+        }))
+        tmp_documents.replace(self._documents_path())
+        self.dirty = False
+
+    def close(self):
+        self.matrix = None
+        self.size = 0
+        self.ids = []
+        self.rows = {}
+        self.documents = []
+        self.columns = {}
+        self.codes = {field: {} for field in self.FILTER_FIELDS}
+
+class ShortlistBackend(NumpyBackend):
+    """Shortlists with truncated, optionally int8-quantised vectors and rescores the best
+    candidates against full-precision vectors kept in a memory-mapped file on disk.
+
+    text-embedding-3 models are trained Matryoshka-style, so a renormalised prefix of each
+    vector is itself a usable embedding for the coarse pass.
+    """
+
+    # Rows dequantised per block while scoring, bounding the temporary float32 copy
+    SCORE_BLOCK_ROWS = 8192
+
+    def __init__(self, path: str = None, dimensions: int = SHORTLIST_DIMENSIONS,
+                 quantize: bool = SHORTLIST_INT8, rescore_candidates: int = RESCORE_CANDIDATES):
+        super().__init__(path)
+        self.shortlist_dimensions = dimensions
+        self.quantize = quantize
+        self.rescore_candidates = rescore_candidates
+        self.matrix_dtype = np.int8 if quantize else np.float32
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.full_dimensions = None
+        self.full = None
+        self.scratch_dir = None
+
+    def _full_path(self) -> Path:
+        if self.path:
+            return self.path / "full_vectors.f32"
+        if self.scratch_dir is None:
+            self.scratch_dir = tempfile.mkdtemp(prefix="cornerguide-vectors-")
+        return Path(self.scratch_dir) / "full_vectors.f32"
+
+    def _state_path(self) -> Path:
+        return self.path / "shortlist.json"
+
+    def _full_vectors(self) -> np.ndarray:
+        if self.full is None:
+            rows = self._full_path().stat().st_size // (4 * self.full_dimensions)
+            self.full = np.memmap(self._full_path(), dtype=np.float32, mode="r", shape=(rows, self.full_dimensions))
+        return self.full
+
+    def create(self, vector_size: int):
+        self.full_dimensions = vector_size
+        self.full = None
+        full_path = self._full_path()
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_bytes(b"")
+        self._reset(min(self.shortlist_dimensions or vector_size, vector_size))
+
+    def _reset(self, width: int):
+        super()._reset(width)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def _reserve(self, rows: int):
+        super()._reserve(rows)
+        if len(self.scales) < self.matrix.shape[0]:
+            scales = np.zeros(self.matrix.shape[0], dtype=np.float32)
+            scales[:self.size] = self.scales[:self.size]
+            self.scales = scales
+
+    def _shortlist(self, normalised: np.ndarray):
+        truncated = self._normalise(normalised[:, :self.matrix.shape[1]])
+        if not self.quantize:
+            return truncated, np.ones(len(truncated), dtype=np.float32)
+        scales = np.maximum(np.abs(truncated).max(axis=1), 1e-12) / 127
+        return np.round(truncated / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _store_vectors(self, rows: np.ndarray, normalised: np.ndarray):
+        with open(self._full_path(), "r+b") as file:
+            for row, vector in zip(rows, normalised):
+                file.seek(int(row) * self.full_dimensions * 4)
+                file.write(vector.tobytes())
+        self.full = None
+
+        shortlist, scales = self._shortlist(normalised)
+        self.matrix[rows] = shortlist
+        self.scales[rows] = scales
+
+    def _keep_vectors(self, kept_rows: np.ndarray):
+        kept_full = np.array(self._full_vectors()[kept_rows])
+        self.full = None
+        tmp_path = self._full_path().with_suffix(".tmp")
+        tmp_path.write_bytes(kept_full.tobytes())
+        tmp_path.replace(self._full_path())
+
+        super()._keep_vectors(kept_rows)
+        self.scales = self.scales[:self.size][kept_rows]
+
+    def _shortlist_scores(self, queries: np.ndarray) -> np.ndarray:
+        queries = self._normalise(queries[:, :self.matrix.shape[1]])
+        if not self.quantize:
+            return queries @ self.matrix[:self.size].T
+
+        scores = np.empty((len(queries), self.size), dtype=np.float32)
+        for start in range(0, self.size, self.SCORE_BLOCK_ROWS):
+            end = min(start + self.SCORE_BLOCK_ROWS, self.size)
+            block = self.matrix[start:end].astype(np.float32)
+            scores[:, start:end] = (queries @ block.T) * self.scales[start:end]
+        return scores
+
+    def search(self, vectors: List[List[float]], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        mask = self._mask(filter_dict)
+        matches = self.size if mask is None else int(mask.sum())
+        k = min(limit, matches)
+        if k <= 0:
+            return [[] for _ in vectors]
+
+        queries = self._normalise(vectors)
+        scores = self._shortlist_scores(queries)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+
+        if self.rescore_candidates <= 0:
+            return [
+                [(self.documents[row], float(query_scores[row])) for row in self._top_rows(query_scores, k)]
+                for query_scores in scores
+            ]
+
+        candidate_count = min(max(limit, self.rescore_candidates), matches)
+        full = self._full_vectors()
+        results = []
+        for query, query_scores in zip(queries, scores):
+            candidates = np.sort(np.argpartition(-query_scores, candidate_count - 1)[:candidate_count])
+            # Only the shortlisted rows are paged in from disk for exact scoring
+            exact_scores = np.asarray(full[candidates]) @ query
+            top = self._top_rows(exact_scores, k)
+            results.append([(self.documents[candidates[i]], float(exact_scores[i])) for i in top])
+        return results
+
+    def open(self) -> bool:
+        if not self.path or not self._state_path().exists() or not self._full_path().exists():
+            return False
+
+        state = json.loads(self._state_path().read_text())
+        self.full_dimensions = state["full_dimensions"]
+        if not super().open():
+            return False
+        self.scales[:self.size] = np.load(self.path / "scales.npy")
+        return True
+
+    def flush(self):
+        if self.path and self.dirty and self.matrix is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            np.save(self.path / "scales.npy", self.scales[:self.size])
+            self._state_path().write_text(json.dumps({
+                "full_dimensions": self.full_dimensions,
+                "shortlist_dimensions": self.matrix.shape[1],
+                "quantize": self.quantize
+            }))
+        super().flush()
+
+    def close(self):
+        super().close()
+        self.full = None
+        self.scales = np.zeros(0, dtype=np.float32)
+        if self.scratch_dir:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            self.scratch_dir = None
+
+class ShardedBackend(VectorBackend):
+    """Keeps one backend per federation, each holding only that federation's chunks.
+
+    Upserts are routed by the federation in each document's metadata and new federations get
+    a shard on first sight. A search restricted to one federation touches only its shard;
+    otherwise every selected shard is searched concurrently and the results are merged with an
+    equal per-federation quota, so one rulebook cannot crowd the others out of the top results.
+    shards.json records which shards exist so open() can find them again.
+    """
+
+    def __init__(self, shard_factory: Callable[[str], VectorBackend], path: str = None):
+        self.shard_factory = shard_factory
+        self.path = Path(path) if path else None
+        self.shards: Dict[str, VectorBackend] = {}
+        self.width: Optional[int] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.width is not None
+
+    @staticmethod
+    def shard_key(federation) -> str:
+        """Filesystem- and collection-safe shard name for a federation value."""
+        value = plain_value(federation)
+        return re.sub(r"[^a-z0-9_-]", "_", str(value).lower()) if value else "unassigned"
+
+    def _state_path(self) -> Path:
+        return self.path / "shards.json"
+
+    def _shard(self, key: str) -> VectorBackend:
+        if key not in self.shards:
+            shard = self.shard_factory(key)
+            shard.create(self.width)
+            self.shards[key] = shard
+        return self.shards[key]
+
+    def open(self) -> bool:
+        if not self.path or not self._state_path().exists():
+            return False
+
+        state = json.loads(self._state_path().read_text())
+        shards = {}
+        try:
+            for key in state["shards"]:
+                shard = self.shard_factory(key)
+                if not shard.open():
+                    for opened in shards.values():
+                        opened.close()
+                    return False
+                shards[key] = shard
+        except Exception:
+            # A shard that cannot be opened (e.g. locked by another process) must not leave the others held
+            for opened in shards.values():
+                opened.close()
+            raise
+        self.shards = shards
+        self.width = state["width"]
+        return True
+
+    def create(self, vector_size: int):
+        self.close()
+        self.width = vector_size
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        groups: Dict[str, List[int]] = {}
+        for i, document in enumerate(documents):
+            groups.setdefault(self.shard_key(document.metadata.get("federation")), []).append(i)
+        for key, indexes in groups.items():
+            self._shard(key).upsert(
+                [ids[i] for i in indexes], [vectors[i] for i in indexes], [documents[i] for i in indexes]
+            )
+
+    def delete_source_files(self, source_files: List[str]):
+        for shard in self.shards.values():
+            shard.delete_source_files(source_files)
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards.values())
+
+    def _select(self, filter_dict: Optional[Dict[str, Any]]) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        if not filter_dict or "federation" not in filter_dict:
+            return list(self.shards), filter_dict
+        keys = [key for key in dict.fromkeys(map(self.shard_key, filter_values(filter_dict["federation"])))
+                if key in self.shards]
+        # Each shard holds a single federation, so the federation condition is already satisfied
+        rest = {field: value for field, value in filter_dict.items() if field != "federation"}
+        return keys, rest or None
+
+    @staticmethod
+    def merge(shard_results: List[List[Tuple[Document, float]]], limit: int) -> List[Tuple[Document, float]]:
+        """Give every shard an equal share of `limit`, then fill what is left by score."""
+        quota = limit // len(shard_results) if shard_results else 0
+        merged = []
+        leftovers = []
+        for results in shard_results:
+            merged.extend(results[:quota])
+            leftovers.extend(results[quota:])
+        leftovers.sort(key=lambda result: result[1], reverse=True)
+        merged.extend(leftovers[:limit - len(merged)])
+        merged.sort(key=lambda result: result[1], reverse=True)
+        return merged
+
+    def search(self, vectors: List[List[float]], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        keys, shard_filter = self._select(filter_dict)
+        if not keys:
+            return [[] for _ in vectors]
+        if len(keys) == 1:
+            return self.shards[keys[0]].search(vectors, shard_filter, limit)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=max(2, len(self.shards)), thread_name_prefix="shard-search")
+        futures = [self.executor.submit(self.shards[key].search, vectors, shard_filter, limit) for key in keys]
+        per_shard = [future.result() for future in futures]
+        return [self.merge([results[i] for results in per_shard], limit) for i in range(len(vectors))]
+
+    def flush(self):
+        for shard in self.shards.values():
+            shard.flush()
+        if self.path and self.width is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._state_path().with_suffix(".tmp")
+            tmp_path.write_text(json.dumps({"width": self.width, "shards": sorted(self.shards)}))
+            tmp_path.replace(self._state_path())
+
+    def close(self):
+        for shard in self.shards.values():
+            shard.close()
+        self.shards = {}
+        self.width = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,187 @@
+import json
+import math
+import re
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from langchain_core.documents import Document
+from config import BM25_K1, BM25_B
+from .backends import SearchResults, FILTER_FIELDS, filter_values, plain_value
+
+# Function words that carry no rule meaning and would only add noise to lexical scores
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i if in is it its of on or so that the their
+them then there these this to was what when where which who why will with you your
+""".split())
+
+class BM25Index:
+    """Okapi BM25 inverted index over chunk documents, searchable without any network call.
+
+    Each term's postings are compiled into row and weight arrays, so scoring a query is a
+    handful of vectorised scatter-adds. Persisted as bm25.json holding every document with its
+    term counts, which lets open() rebuild the postings without tokenising again.
+    """
+
+    def __init__(self, path: str = None, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._reset()
+
+    def _reset(self):
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.documents: List[Document] = []
+        self.term_counts: List[Dict[str, int]] = []
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        self.compiled = False
+        self.dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.documents)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        tokens = []
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            if token in STOPWORDS:
+                continue
+            # Light plural folding so "heel hooks" matches "heel hook"
+            if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]
+            tokens.append(token)
+        return tokens
+
+    def add(self, ids: List[str], documents: List[Document]):
+        for point_id, document in zip(ids, documents):
+            document = Document(page_content=document.page_content, metadata=json.loads(json.dumps(document.metadata)))
+            counts = dict(Counter(self.tokenize(document.page_content)))
+            row = self.rows.get(point_id)
+            if row is None:
+                self.rows[point_id] = len(self.ids)
+                self.ids.append(point_id)
+                self.documents.append(document)
+                self.term_counts.append(counts)
+            else:
+                self.documents[row] = document
+                self.term_counts[row] = counts
+        self.compiled = False
+        self.dirty = True
+
+    def delete_source_files(self, source_files: List[str]):
+        stale = set(source_files)
+        kept = [i for i, doc in enumerate(self.documents) if doc.metadata.get("source_file") not in stale]
+        if len(kept) == len(self.documents):
+            return
+        self.ids = [self.ids[i] for i in kept]
+        self.documents = [self.documents[i] for i in kept]
+        self.term_counts = [self.term_counts[i] for i in kept]
+        self.rows = {point_id: row for row, point_id in enumerate(self.ids)}
+        self.compiled = False
+        self.dirty = True
+
+    def count(self) -> int:
+        return len(self.documents)
+
+    def _compile(self):
+        lengths = np.array([sum(counts.values()) for counts in self.term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+        norms = self.k1 * (1 - self.b + self.b * lengths / average_length) if average_length else np.full(len(lengths), self.k1)
+
+        rows_by_term: Dict[str, List[int]] = {}
+        tfs_by_term: Dict[str, List[int]] = {}
+        for row, counts in enumerate(self.term_counts):
+            for term, tf in counts.items():
+                rows_by_term.setdefault(term, []).append(row)
+                tfs_by_term.setdefault(term, []).append(tf)
+
+        total = len(self.documents)
+        self.postings = {}
+        for term, rows in rows_by_term.items():
+            rows = np.array(rows, dtype=np.int32)
+            tfs = np.array(tfs_by_term[term], dtype=np.float32)
+            idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (rows, (idf * tfs * (self.k1 + 1) / (tfs + norms[rows])).astype(np.float32))
+
+        self.columns = {
+            field: np.array([str(plain_value(doc.metadata.get(field))) for doc in self.documents], dtype=object)
+            for field in FILTER_FIELDS
+        }
+        self.compiled = True
+
+    def _mask(self, filter_dict: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filter_dict:
+            return None
+        mask = np.ones(len(self.documents), dtype=bool)
+        for field, value in filter_dict.items():
+            if field not in self.columns:
+                raise ValueError(f"BM25Index cannot filter on '{field}'; supported fields: {FILTER_FIELDS}")
+            mask &= np.isin(self.columns[field], filter_values(value))
+        return mask
+
+    def score(self, query: str) -> np.ndarray:
+        if not self.compiled:
+            self._compile()
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def search(self, queries: List[str], filter_dict: Optional[Dict[str, Any]], limit: int) -> SearchResults:
+        """Return the top `limit` (document, BM25 score) pairs for each query; unmatched chunks are left out."""
+        if not self.compiled:
+            self._compile()
+        mask = self._mask(filter_dict)
+
+        results = []
+        for query in queries:
+            scores = self.score(query)
+            if mask is not None:
+                scores[~mask] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            results.append([(self.documents[row], float(scores[row])) for row in candidates])
+        return results
+
+    def _index_path(self) -> Path:
+        return self.path / "bm25.json"
+
+    def open(self) -> bool:
+        if not self.path or not self._index_path().exists():
+            return False
+
+        stored = json.loads(self._index_path().read_text())
+        self._reset()
+        for item in stored["documents"]:
+            self.rows[item["id"]] = len(self.ids)
+            self.ids.append(item["id"])
+            self.documents.append(Document(page_content=item["page_content"], metadata=item["metadata"]))
+            self.term_counts.append(item["terms"])
+        return True
+
+    def flush(self):
+        if not self.path or not self.dirty:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._index_path().with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "k1": self.k1,
+            "b": self.b,
+            "documents": [
+                {"id": point_id, "page_content": doc.page_content, "metadata": doc.metadata, "terms": counts}
+                for point_id, doc, counts in zip(self.ids, self.documents, self.term_counts)
+            ]
+        }))
+        tmp_path.replace(self._index_path())
+        self.dirty = False
+
+    def close(self):
+        self._reset()
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from contextlib import contextmanager
+from config import CACHE_DIR, EMBEDDING_MODEL, EMBEDDING_CACHE_ENABLED
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings model with a persistent cache keyed by model, dimensions and text hash.
+
+    Vectors live in a float32 matrix file that is appended to and read through a memory map;
+    index.json maps each text's sha256 to its row. Appends hold an exclusive lock on the cache
+    folder and merge the index on disk before rewriting it, so several processes can share one
+    cache without overwriting each other's rows.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache_dir: str = None):
+        self.embeddings = embeddings
+        self.model = model
+        self.dimensions = getattr(embeddings, "dimensions", None)
+
+        namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{model}-{self.dimensions or 'native'}")
+        self.cache_dir = Path(cache_dir or CACHE_DIR) / "embeddings" / namespace
+        self.matrix_path = self.cache_dir / "vectors.f32"
+        self.index_path = self.cache_dir / "index.json"
+        self.lock_path = self.cache_dir / ".lock"
+
+        self.lock = threading.Lock()
+        self.rows: Dict[str, int] = {}
+        self.width: Optional[int] = None
+        self.matrix = None
+
+        self.hits = 0
+        self.misses = 0
+        self.chars_saved = 0
+        self.miss_seconds = 0.0
+        self._load_index()
+
+    def _read_index(self) -> Optional[Dict[str, Any]]:
+        if not self.index_path.exists():
+            return None
+        index = json.loads(self.index_path.read_text())
+        # Rows past the end of the matrix belong to an append that never completed
+        stored_rows = self._stored_rows(index["width"])
+        index["rows"] = {key: row for key, row in index["rows"].items() if row < stored_rows}
+        return index
+
+    def _stored_rows(self, width: int) -> int:
+        return self.matrix_path.stat().st_size // (4 * width) if self.matrix_path.exists() else 0
+
+    def _load_index(self):
+        try:
+            index = self._read_index()
+            if index:
+                self.rows = index["rows"]
+                self.width = index["width"]
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable embedding cache index: {e}")
+            self.rows = {}
+            self.width = None
+
+    @contextmanager
+    def _file_lock(self):
+        # Serialises appends across processes; without fcntl (Windows) only threads are serialised
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "model": self.model,
+            "dimensions": self.dimensions,
+            "width": self.width,
+            "rows": self.rows
+        }))
+        tmp_path.replace(self.index_path)
+
+    def _open_matrix(self):
+        if self.matrix is None and self.rows:
+            row_count = self.matrix_path.stat().st_size // (4 * self.width)
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(row_count, self.width))
+        return self.matrix
+
+    def _append(self, keys: List[str], vectors: List[List[float]]):
+        if self.width is None:
+            self.width = len(vectors[0])
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                # Other processes may have appended since this instance last read the index
+                try:
+                    index = self._read_index()
+                except Exception:
+                    index = None
+                if index and index["width"] == self.width:
+                    self.rows.update(index["rows"])
+                new = [(key, vector) for key, vector in zip(keys, vectors) if key not in self.rows]
+                if new:
+                    start_row = self._stored_rows(self.width)
+                    # Drop the tail of an append that never completed so rows stay aligned
+                    if self.matrix_path.exists() and self.matrix_path.stat().st_size != start_row * 4 * self.width:
+                        os.truncate(self.matrix_path, start_row * 4 * self.width)
+                    with open(self.matrix_path, "ab") as file:
+                        file.write(np.asarray([vector for _, vector in new], dtype=np.float32).tobytes())
+                    for offset, (key, _) in enumerate(new):
+                        self.rows[key] = start_row + offset
+                self._write_index()
+            # The matrix grew, so the next lookup remaps it
+            self.matrix = None
+        except Exception as e:
+            print(f"Warning: Failed to write embedding cache: {e}")
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _embed(self, texts: List[str], embed_missing) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        with self.lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self.rows:
+                    missing.setdefault(key, text)
+
+        # The API call runs outside the lock so concurrent batches are not serialised
+        fresh = {}
+        elapsed = 0.0
+        if missing:
+            start = time.perf_counter()
+            vectors = embed_missing(list(missing.values()))
+            elapsed = time.perf_counter() - start
+            fresh = dict(zip(missing, vectors))
+
+        with self.lock:
+            if fresh:
+                self.miss_seconds += elapsed
+                new_keys = [key for key in fresh if key not in self.rows]
+                if new_keys:
+                    self._append(new_keys, [fresh[key] for key in new_keys])
+
+            matrix = self._open_matrix()
+            results = []
+            for key, text in zip(keys, texts):
+                if key in fresh:
+                    results.append(list(fresh[key]))
+                else:
+                    results.append(matrix[self.rows[key]].tolist())
+
+                # Repeats of a text within one call are only sent once, so they count as hits
+                if missing.pop(key, None) is not None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.chars_saved += len(text)
+            return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], lambda missing: [self.embeddings.embed_query(missing[0])])[0]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        seconds_per_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.rows),
+            # Roughly four characters per token for English rulebook text
+            "tokens_saved": self.chars_saved // 4,
+            "seconds_saved": self.hits * seconds_per_miss
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate), ~{stats['tokens_saved']} tokens and "
+              f"~{stats['seconds_saved']:.1f}s of embedding calls saved, {stats['entries']} entries")
+
+def build_embeddings(model: str = EMBEDDING_MODEL, use_cache: bool = EMBEDDING_CACHE_ENABLED) -> Embeddings:
+    embeddings = OpenAIEmbeddings(model=model)
+    return CachedEmbeddings(embeddings, model) if use_cache else embeddings
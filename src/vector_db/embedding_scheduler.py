@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import List, Dict, Any, AsyncIterator, Tuple
+from langchain_core.embeddings import Embeddings
+from openai import RateLimitError
+from config import EMBED_BATCH_TOKENS, EMBED_CONCURRENCY, EMBED_TOKENS_PER_MINUTE, EMBED_MAX_RETRIES
+
+# OpenAI rejects embedding requests with more inputs than this
+_MAX_BATCH_INPUTS = 2048
+
+class EmbeddingScheduler:
+    """Embeds texts in token-budgeted batches with bounded concurrency and adaptive 429 backoff.
+
+    A sliding one-minute window keeps requests under the tokens-per-minute limit. When the
+    API still answers 429, every worker pauses for a shared cooldown that doubles with each
+    consecutive rate-limit response and resets after a success. The concurrency bound is shared
+    by every iter_embeddings call running on the same event loop.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_tokens: int = EMBED_BATCH_TOKENS,
+                 concurrency: int = EMBED_CONCURRENCY, tokens_per_minute: int = EMBED_TOKENS_PER_MINUTE,
+                 max_retries: int = EMBED_MAX_RETRIES, base_delay: float = 1.0):
+        self.embeddings = embeddings
+        self.batch_tokens = batch_tokens
+        self.concurrency = max(1, concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        self.window = deque()
+        self.window_tokens = 0
+        self.cooldown_until = 0.0
+        self.consecutive_limits = 0
+        self.semaphore = None
+        self.semaphore_loop = None
+        self.active = 0
+        self.active_since = 0.0
+
+        self.batches = 0
+        self.tokens = 0
+        self.rate_limited = 0
+        self.seconds = 0.0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        # Roughly four characters per token for English rulebook text
+        return max(1, len(text) // 4)
+
+    def pack(self, texts: List[str]) -> List[List[int]]:
+        """Group text indexes, in order, into batches that stay under the token budget."""
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.batch_tokens or len(batch) >= _MAX_BATCH_INPUTS):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _reserve(self, tokens: int):
+        if not self.tokens_per_minute:
+            return
+
+        while True:
+            now = time.monotonic()
+            while self.window and now - self.window[0][0] >= 60:
+                self.window_tokens -= self.window.popleft()[1]
+
+            # An oversized batch is still let through once the window is empty
+            if not self.window or self.window_tokens + tokens <= self.tokens_per_minute:
+                self.window.append((now, tokens))
+                self.window_tokens += tokens
+                return
+            await asyncio.sleep(60 - (now - self.window[0][0]))
+
+    async def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            delay = self.cooldown_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._reserve(tokens)
+
+            try:
+                vectors = await self.embeddings.aembed_documents(texts)
+                self.consecutive_limits = 0
+                return vectors
+            except RateLimitError:
+                if attempt == self.max_retries:
+                    raise
+                self.rate_limited += 1
+                self.consecutive_limits += 1
+                backoff = self.base_delay * 2 ** min(self.consecutive_limits - 1, 6)
+                self.cooldown_until = max(self.cooldown_until, time.monotonic() + backoff + random.uniform(0, backoff / 2))
+                print(f"Warning: Embedding rate limited, backing off {backoff:.1f}s (retry {attempt + 1}/{self.max_retries})")
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self.semaphore_loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.semaphore_loop = loop
+        return self.semaphore
+
+    async def iter_embeddings(self, texts: List[str]) -> AsyncIterator[Tuple[List[int], List[List[float]]]]:
+        """Yield (text indexes, vectors) for each batch as soon as it finishes embedding."""
+        semaphore = self._semaphore()
+        # Wall-clock time while any call is embedding, so overlapping calls are not counted twice
+        if not self.active:
+            self.active_since = time.perf_counter()
+        self.active += 1
+
+        async def run(indexes: List[int]) -> Tuple[List[int], List[List[float]]]:
+            batch_texts = [texts[i] for i in indexes]
+            tokens = sum(self.estimate_tokens(text) for text in batch_texts)
+            async with semaphore:
+                vectors = await self._embed_batch(batch_texts, tokens)
+            self.batches += 1
+            self.tokens += tokens
+            return indexes, vectors
+
+        tasks = [asyncio.create_task(run(indexes)) for indexes in self.pack(texts)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.active -= 1
+            if not self.active:
+                self.seconds += time.perf_counter() - self.active_since
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "tokens": self.tokens,
+            "rate_limited": self.rate_limited,
+            "seconds": self.seconds,
+            "tokens_per_second": self.tokens / self.seconds if self.seconds else 0.0
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Embedding scheduler: {stats['batches']} batches, ~{stats['tokens']} tokens in "
+              f"{stats['seconds']:.1f}s (~{stats['tokens_per_second']:.0f} tokens/s, "
+              f"concurrency {self.concurrency}), {stats['rate_limited']} rate-limit retries")
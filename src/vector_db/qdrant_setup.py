@@ -1,14 +1,331 @@
-from langchain_qdrant import Qdrant
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from typing import List, Dict, Any
-from config import COLLECTION_NAME, EMBEDDING_MODEL
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple, Union
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import queue
+import shutil
+import threading
+import time
+import uuid
+from config import (
+    COLLECTION_NAME, EMBEDDING_MODEL, STREAM_BATCH_SIZE, STREAM_QUEUE_SIZE, STREAMING_INGEST,
+    CHUNK_SIZE, CHUNK_OVERLAP, EXTRACTOR_VERSION, TABLE_ROUTING_ENABLED, DEDUP_ENABLED,
+    DEDUP_THRESHOLD, PERSIST_INDEX, INDEX_DIR, VECTOR_BACKEND, EMBEDDING_INDEX_MODE,
+    SHORTLIST_DIMENSIONS, SHORTLIST_INT8, FEDERATION_SHARDING, QUERY_CACHE_ENABLED, RETRIEVAL_MODE,
+    MEMORY_BOUNDED_EXTRACTION
+)
 from src.models.rules import RuleChunk
+from .embedding_cache import CachedEmbeddings, build_embeddings
+from .embedding_scheduler import EmbeddingScheduler
+from .query_cache import QueryEmbeddingCache
+from .bm25_index import BM25Index
+from .rank_fusion import reciprocal_rank_fusion
+from .backends import (
+    VectorBackend, QdrantBackend, NumpyBackend, ShortlistBackend, ShardedBackend, FilterValue, filter_values, plain_value
+)
+
+_STREAM_END = object()
+
+# Chunks to stream, or a callable taking a status callback that returns them
+ChunkSource = Union[Iterable[RuleChunk], Callable[..., Iterable[RuleChunk]]]
 
 class QdrantManager:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-        self.vectorstore = None
+    def __init__(self, persist: bool = PERSIST_INDEX, index_dir: str = None, backend: str = VECTOR_BACKEND,
+                 sharded: bool = FEDERATION_SHARDING):
+        self.embeddings = build_embeddings()
+        self.query_cache = QueryEmbeddingCache() if QUERY_CACHE_ENABLED else None
+        self.chunk_count = 0
+        # source_file -> content hash of the PDF version currently in the collection
+        self.indexed_files: Dict[str, str] = {}
+        # source_file -> {canonical chunk_id: chunk_ids merged into it}, to spot dedup changes on sync
+        self.indexed_chunks: Dict[str, Dict[str, List[str]]] = {}
+        self.index_dir = Path(index_dir or INDEX_DIR) if persist else None
+        self.backend_name = backend
+        self.sharded = sharded
+        if EMBEDDING_INDEX_MODE == "shortlist" and backend != "numpy":
+            print(f"Shortlist index mode stores vectors with NumPy; ignoring the '{backend}' backend")
+        self._attach(self.index_dir)
+    
+    def _attach(self, data_dir: Optional[Path]):
+        """Create closed backends stored under data_dir, the index folder or a build folder beside it."""
+        self.data_dir = data_dir
+        if self.sharded:
+            self.backend = ShardedBackend(
+                lambda shard: self._create_backend(self.backend_name, data_dir, shard),
+                path=str(data_dir / "shards") if data_dir else None
+            )
+        else:
+            self.backend = self._create_backend(self.backend_name, data_dir)
+        # Lexical index over the same chunks, kept in step with the vector backend
+        self.lexical_index = BM25Index(path=str(data_dir / "bm25") if data_dir else None)
+    
+    def _create_backend(self, name: str, data_dir: Optional[Path], shard: str = None) -> VectorBackend:
+        # Each federation shard gets its own folder and collection
+        root = data_dir / "shards" / shard if data_dir and shard else data_dir
+        collection_name = f"{COLLECTION_NAME}_{shard}" if shard else COLLECTION_NAME
+        
+        if EMBEDDING_INDEX_MODE == "shortlist":
+            return ShortlistBackend(path=str(root / "shortlist") if root else None)
+        if name == "qdrant":
+            path = str(root / "collection") if root else None
+            return QdrantBackend(path=path, collection_name=collection_name)
+        if name == "numpy":
+            return NumpyBackend(path=str(root / "numpy") if root else None)
+        raise ValueError(f"Unknown vector backend: {name}")
+    
+    @property
+    def ready(self) -> bool:
+        return self.backend.ready
+    
+    def _index_settings(self) -> Dict[str, Any]:
+        # Anything that changes the stored vectors or chunk boundaries forces a rebuild
+        return {
+            "collection_name": COLLECTION_NAME,
+            "vector_backend": self.backend_name,
+            "federation_sharding": self.sharded,
+            "index_mode": EMBEDDING_INDEX_MODE,
+            "shortlist": [SHORTLIST_DIMENSIONS, SHORTLIST_INT8] if EMBEDDING_INDEX_MODE == "shortlist" else None,
+            "embedding_model": EMBEDDING_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "extractor_version": EXTRACTOR_VERSION,
+            "table_routing": TABLE_ROUTING_ENABLED,
+            "memory_bounded_extraction": MEMORY_BOUNDED_EXTRACTION,
+            "dedup_threshold": DEDUP_THRESHOLD if DEDUP_ENABLED else None,
+            "dedup_scope": "global",
+            "payload_format": "plain",
+            "lexical_index": "bm25"
+        }
+    
+    @staticmethod
+    def corpus_hash(files: Dict[str, str]) -> str:
+        digest = hashlib.sha256()
+        for name in sorted(files):
+            digest.update(f"{name}:{files[name]}\n".encode("utf-8"))
+        return digest.hexdigest()
+    
+    @property
+    def index_version(self) -> str:
+        """Identifies the indexed content; changes whenever settings or rulebook versions change."""
+        digest = hashlib.sha256(json.dumps(self._index_settings(), sort_keys=True).encode("utf-8"))
+        digest.update(self.corpus_hash(self.indexed_files).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def _manifest_path(self) -> Path:
+        return self.data_dir / "manifest.json"
+    
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        manifest_path = self._manifest_path()
+        if not manifest_path.exists():
+            return None
+        try:
+            return json.loads(manifest_path.read_text())
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable index manifest: {e}")
+            return None
+    
+    def _write_manifest(self):
+        if not self.data_dir:
+            return
+        
+        try:
+            self.backend.flush()
+            self.lexical_index.flush()
+            manifest = {
+                "settings": self._index_settings(),
+                "corpus_hash": self.corpus_hash(self.indexed_files),
+                "files": self.indexed_files,
+                "chunks": self.indexed_chunks,
+                "chunk_count": self.chunk_count,
+                "built_at": time.time()
+            }
+            manifest_path = self._manifest_path()
+            tmp_path = manifest_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(manifest, indent=2))
+            tmp_path.replace(manifest_path)
+        except Exception as e:
+            print(f"Warning: Failed to write index manifest: {e}")
+    
+    def _log_embedding_stats(self):
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self.embeddings.report()
+    
+    def _close(self):
+        self.backend.close()
+        self.lexical_index.close()
+        self.chunk_count = 0
+        self.indexed_files = {}
+        self.indexed_chunks = {}
+    
+    def _build_dir(self, suffix: str) -> Path:
+        return self.index_dir.with_name(f"{self.index_dir.name}.{suffix}")
+    
+    def _start_build(self):
+        """Point empty backends at a fresh build folder; the persisted index is only replaced on success."""
+        # Local Qdrant locks its folder, so the open backend is released first
+        self._close()
+        build_dir = None
+        if self.index_dir:
+            build_dir = self._build_dir("building")
+            shutil.rmtree(build_dir, ignore_errors=True)
+            build_dir.mkdir(parents=True, exist_ok=True)
+        self._attach(build_dir)
+    
+    def _finish_build(self):
+        """Write the manifest into the build folder, swap it in for the persisted index and reopen it."""
+        self._write_manifest()
+        if not self.index_dir:
+            return
+        
+        indexed_files, indexed_chunks = self.indexed_files, self.indexed_chunks
+        build_dir = self.data_dir
+        self._close()
+        previous_dir = self._build_dir("previous")
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        if self.index_dir.exists():
+            self.index_dir.rename(previous_dir)
+        build_dir.rename(self.index_dir)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+        
+        self._attach(self.index_dir)
+        self._open_collection()
+        self.indexed_files, self.indexed_chunks = indexed_files, indexed_chunks
+    
+    def _abort_build(self):
+        """Drop a failed build and leave the persisted index as it was."""
+        build_dir = self.data_dir if self.data_dir != self.index_dir else None
+        self._close()
+        if build_dir:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        self._attach(self.index_dir)
+    
+    def _open_collection(self) -> bool:
+        """Open the persisted index; False when nothing is persisted, raises when it cannot be opened."""
+        try:
+            if not self.backend.open():
+                return False
+            if not self.lexical_index.open():
+                self.backend.close()
+                return False
+        except Exception:
+            self._close()
+            raise
+        self.chunk_count = self.backend.count()
+        return True
+    
+    def load_or_build(self, processor, status_callback=None, streaming: bool = STREAMING_INGEST) -> bool:
+        """Open the persisted collection when its manifest matches, otherwise rebuild it.
+        
+        A matching index that cannot be opened (e.g. locked by another process) is reported as a
+        failure and left untouched rather than rebuilt over.
+        """
+        if self.index_dir and not self.ready:
+            start = time.perf_counter()
+            manifest = self._read_manifest()
+            if manifest and manifest.get("settings") == self._index_settings():
+                try:
+                    opened = self._open_collection()
+                except Exception as e:
+                    print(f"Error: Failed to open persisted vectorstore at {self.index_dir}: {e}")
+                    return False
+                
+                if opened:
+                    self.indexed_files = manifest.get("files", {})
+                    self.indexed_chunks = manifest.get("chunks", {})
+                    print(f"Loaded persisted vectorstore with {self.chunk_count} chunks "
+                          f"in {time.perf_counter() - start:.2f}s")
+                    
+                    # Only the rulebooks that differ from the manifest are re-embedded
+                    if manifest.get("corpus_hash") != self.corpus_hash(processor.scan_assets()):
+                        changes = self.sync_with_assets(processor, status_callback=status_callback)
+                        return not changes["failed"]
+                    return True
+        
+        if streaming:
+            return self.create_from_chunk_stream(processor.iter_chunks, status_callback=status_callback)
+        return self.create_from_chunks(processor.process_all_pdfs(status_callback=status_callback))
+    
+    def _chunk_to_document(self, chunk: RuleChunk) -> Document:
+        chunk_metadata = chunk.metadata or {}
+        metadata = {
+            # Plain strings keep payloads JSON-native and matchable by keyword payload indexes
+            "federation": plain_value(chunk.federation),
+            "category": plain_value(chunk.category),
+            "belt_level": plain_value(chunk.belt_level),
+            "technique": chunk.technique,
+            "source_page": chunk.source_page,
+            "page_end": chunk_metadata.get("page_end"),
+            "source_file": chunk_metadata.get("source_file"),
+            "content_hash": chunk_metadata.get("content_hash"),
+            "chunk_id": chunk_metadata.get("chunk_id"),
+            "duplicate_sources": chunk_metadata.get("duplicate_sources")
+        }
+        return Document(
+            page_content=chunk.content,
+            metadata=metadata
+        )
+    
+    def _document_ids(self, documents: List[Document]) -> Optional[List[str]]:
+        ids = [doc.metadata.get("chunk_id") for doc in documents]
+        return ids if all(ids) else None
+    
+    def _file_hashes(self, documents: List[Document]) -> Dict[str, str]:
+        # A file whose chunks all merged into other files' chunks is indexed through duplicate_sources
+        sources = [
+            source for doc in documents
+            for source in [doc.metadata] + list(doc.metadata.get("duplicate_sources") or [])
+        ]
+        return {
+            source["source_file"]: source["content_hash"]
+            for source in sources
+            if source.get("source_file") and source.get("content_hash")
+        }
+    
+    @staticmethod
+    def _chunk_state(documents: List[Document]) -> Dict[str, Dict[str, List[str]]]:
+        state: Dict[str, Dict[str, List[str]]] = {}
+        for doc in documents:
+            source_file = doc.metadata.get("source_file")
+            chunk_id = doc.metadata.get("chunk_id")
+            if source_file and chunk_id:
+                state.setdefault(source_file, {})[chunk_id] = sorted(
+                    source["chunk_id"] for source in doc.metadata.get("duplicate_sources") or []
+                    if source.get("chunk_id")
+                )
+        return state
+    
+    async def _upsert(self, upsert_lock: asyncio.Lock, ids: List[str], vectors: List[List[float]],
+                      documents: List[Document]):
+        # Backends are not safe for concurrent writes, so upserts from every batch take turns
+        async with upsert_lock:
+            if not self.backend.ready:
+                self.backend.create(len(vectors[0]))
+            await asyncio.to_thread(self.backend.upsert, ids, vectors, documents)
+    
+    async def _index_documents_async(self, documents: List[Document], scheduler: EmbeddingScheduler,
+                                     upsert_lock: asyncio.Lock):
+        ids = self._document_ids(documents) or [uuid.uuid4().hex for _ in documents]
+        texts = [doc.page_content for doc in documents]
+        
+        pending_upsert = None
+        async for indexes, vectors in scheduler.iter_embeddings(texts):
+            # One upsert at a time runs on a worker thread while later batches keep embedding
+            if pending_upsert:
+                await pending_upsert
+            pending_upsert = asyncio.create_task(self._upsert(
+                upsert_lock, [ids[i] for i in indexes], vectors, [documents[i] for i in indexes]
+            ))
+        
+        if pending_upsert:
+            await pending_upsert
+        self.lexical_index.add(ids, documents)
+    
+    def _index_documents(self, documents: List[Document], scheduler: EmbeddingScheduler = None):
+        asyncio.run(self._index_documents_async(
+            documents, scheduler or EmbeddingScheduler(self.embeddings), asyncio.Lock()
+        ))
     
     def create_from_chunks(self, chunks: List[RuleChunk]) -> bool:
         if not chunks:
@@ -16,71 +333,336 @@ class QdrantManager:
             return False
         
         try:
-            documents = []
-            for chunk in chunks:
-                metadata = {
-                    "federation": chunk.federation,
-                    "category": chunk.category,
-                    "belt_level": chunk.belt_level,
-                    "technique": chunk.technique,
-                    "source_page": chunk.source_page
-                }
-                doc = Document(
-                    page_content=chunk.content,
-                    metadata=metadata
-                )
-                documents.append(doc)
+            documents = [self._chunk_to_document(chunk) for chunk in chunks]
             
-            self.vectorstore = Qdrant.from_documents(
-                documents,
-                self.embeddings,
-                location=":memory:",
-                collection_name=COLLECTION_NAME
-            )
+            self._start_build()
+            scheduler = EmbeddingScheduler(self.embeddings)
+            self._index_documents(documents, scheduler)
             
+            self.chunk_count = len(chunks)
+            self.indexed_files = self._file_hashes(documents)
+            self.indexed_chunks = self._chunk_state(documents)
+            self._finish_build()
             print(f"Created vectorstore with {len(chunks)} chunks")
+            scheduler.report()
+            self._log_embedding_stats()
             return True
         except Exception as e:
             print(f"Error: Failed to create vectorstore: {e}")
+            self._abort_build()
             return False
     
-    def search_similar(self, query: str, federation_filter: str = None, category_filter: str = None, 
-                      belt_level_filter: str = None, limit: int = 10) -> List[dict]:
-        if not self.vectorstore:
-            print("Error: Vectorstore not initialized")
-            return []
+    def _produce_batches(self, chunks: ChunkSource, batches: queue.Queue, batch_size: int, stop: threading.Event,
+                         relay_status: bool):
+        # Runs on a background thread so PDF extraction overlaps with embedding requests
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
         
+        batch = []
         try:
-            filter_dict = {}
+            if callable(chunks):
+                # Status messages travel through the queue in order with the batches
+                chunks = chunks(put if relay_status else None)
+            for chunk in chunks:
+                batch.append(self._chunk_to_document(chunk))
+                if len(batch) >= batch_size:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch:
+                put(batch)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_STREAM_END)
+    
+    async def _index_stream_async(self, batches: queue.Queue, scheduler: EmbeddingScheduler,
+                                  status_callback=None) -> Tuple[int, Dict[str, str], Dict[str, Dict[str, List[str]]]]:
+        """Index stream batches on one event loop, embedding several batches at once.
+        
+        The scheduler's concurrency bound is shared by all batches in flight, so requests from
+        consecutive stream batches fill its slots and embedding overlaps earlier batches' upserts.
+        A batch that re-sends chunks already streamed waits for everything in flight, so its
+        newer payloads are upserted last.
+        """
+        upsert_lock = asyncio.Lock()
+        in_flight = set()
+        streamed_ids = set()
+        indexed_ids = set()
+        indexed_files = {}
+        indexed_chunks = {}
+        
+        async def collect(return_when):
+            nonlocal in_flight
+            done, in_flight = await asyncio.wait(in_flight, return_when=return_when)
+            for task in done:
+                batch = task.result()
+                indexed_ids.update(doc.metadata.get("chunk_id") or id(doc) for doc in batch)
+                indexed_files.update(self._file_hashes(batch))
+                for source_file, chunks in self._chunk_state(batch).items():
+                    indexed_chunks.setdefault(source_file, {}).update(chunks)
+            if done and status_callback:
+                status_callback(f"Indexed {len(indexed_ids)} chunks...")
+        
+        async def index_batch(batch: List[Document]) -> List[Document]:
+            await self._index_documents_async(batch, scheduler, upsert_lock)
+            return batch
+        
+        try:
+            while True:
+                batch = await asyncio.to_thread(batches.get)
+                if batch is _STREAM_END:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                if isinstance(batch, str):
+                    status_callback(batch)
+                    continue
+                
+                chunk_ids = {doc.metadata.get("chunk_id") for doc in batch} - {None}
+                if chunk_ids & streamed_ids and in_flight:
+                    await collect(asyncio.ALL_COMPLETED)
+                streamed_ids.update(chunk_ids)
+                
+                in_flight.add(asyncio.create_task(index_batch(batch)))
+                # Enough batches in flight to keep every embedding slot busy
+                if len(in_flight) > scheduler.concurrency:
+                    await collect(asyncio.FIRST_COMPLETED)
             
-            if federation_filter and federation_filter != "All":
-                filter_dict["federation"] = federation_filter
+            while in_flight:
+                await collect(asyncio.FIRST_COMPLETED)
+        finally:
+            for task in in_flight:
+                task.cancel()
+        return len(indexed_ids), indexed_files, indexed_chunks
+    
+    def create_from_chunk_stream(self, chunks: ChunkSource, status_callback=None,
+                                 batch_size: int = STREAM_BATCH_SIZE, queue_size: int = STREAM_QUEUE_SIZE) -> bool:
+        """Build the index from chunks extracted on a background thread while earlier batches embed.
+        
+        A callable chunk source such as PDFProcessor.iter_chunks gets a callback that queues its
+        status messages, which are reported from the calling thread since Streamlit drops UI
+        updates from threads without a script run context.
+        """
+        self._start_build()
+        # The bounded queue applies backpressure when embedding falls behind extraction
+        batches = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce_batches,
+            args=(chunks, batches, batch_size, stop, status_callback is not None),
+            daemon=True
+        )
+        producer.start()
+        
+        scheduler = EmbeddingScheduler(self.embeddings)
+        try:
+            indexed, indexed_files, indexed_chunks = asyncio.run(self._index_stream_async(batches, scheduler, status_callback))
+        except Exception as e:
+            print(f"Error: Failed to stream chunks into vectorstore: {e}")
+            self._abort_build()
+            return False
+        finally:
+            stop.set()
+        
+        if not indexed:
+            print("Warning: No chunks to create vectorstore from")
+            self._abort_build()
+            return False
+        
+        self.chunk_count = indexed
+        self.indexed_files = indexed_files
+        self.indexed_chunks = indexed_chunks
+        try:
+            self._finish_build()
+        except Exception as e:
+            print(f"Error: Failed to replace the persisted vectorstore: {e}")
+            self._abort_build()
+            return False
+        print(f"Created vectorstore with {indexed} chunks")
+        scheduler.report()
+        self._log_embedding_stats()
+        return True
+    
+    def sync_with_assets(self, processor, status_callback=None) -> Dict[str, List[str]]:
+        """Re-ingest only rulebooks that were added, changed or removed since the last build."""
+        current_files = processor.scan_assets()
+        
+        added = sorted(name for name in current_files if name not in self.indexed_files)
+        changed = sorted(
+            name for name, content_hash in current_files.items()
+            if name in self.indexed_files and self.indexed_files[name] != content_hash
+        )
+        removed = sorted(name for name in self.indexed_files if name not in current_files)
+        # Files whose sync did not complete; the manifest keeps them stale so the next sync retries
+        changes = {"added": added, "changed": changed, "removed": removed, "failed": []}
+        
+        if not self.ready:
+            if not self.create_from_chunks(processor.process_all_pdfs(status_callback=status_callback)):
+                changes["failed"] = sorted(current_files)
+            return changes
+        
+        if not (added or changed or removed):
+            print("Vectorstore is up to date with assets")
+            return changes
+        
+        try:
+            if processor.deduplicate:
+                chunks, reindexed = self._dedup_sync_chunks(processor, current_files, added + changed, status_callback)
+            else:
+                chunks = processor.process_pdfs(added + changed, status_callback=status_callback)
+                reindexed = added + changed
             
-            if category_filter:
-                filter_dict["category"] = category_filter
-                
-            if belt_level_filter:
-                filter_dict["belt_level"] = belt_level_filter
+            stale_files = sorted(set(reindexed) | set(removed))
+            self.backend.delete_source_files(stale_files)
+            self.lexical_index.delete_source_files(stale_files)
+            for name in stale_files:
+                self.indexed_chunks.pop(name, None)
+            for name in changed + removed:
+                self.indexed_files.pop(name, None)
             
-            results = self.vectorstore.similarity_search_with_score(
-                query,
-                k=limit,
-                filter=filter_dict if filter_dict else None
-            )
+            if chunks:
+                documents = [self._chunk_to_document(chunk) for chunk in chunks]
+                self._index_documents(documents)
+                self.indexed_files.update(self._file_hashes(documents))
+                self.indexed_chunks.update(self._chunk_state(documents))
             
-            formatted_results = []
-            for doc, score in results:
-                formatted_results.append({
-                    "content": doc.page_content,
-                    "federation": doc.metadata.get("federation"),
-                    "category": doc.metadata.get("category"),
-                    "belt_level": doc.metadata.get("belt_level"),
-                    "technique": doc.metadata.get("technique"),
-                    "score": score,
-                    "metadata": doc.metadata
-                })
+            self.chunk_count = self.backend.count()
+            self._write_manifest()
+            print(f"Synced vectorstore: {len(added)} added, {len(changed)} changed, "
+                  f"{len(removed)} removed, {len(chunks)} chunks embedded")
+            self._log_embedding_stats()
+        except Exception as e:
+            print(f"Error: Failed to sync vectorstore with assets: {e}")
+            changes["failed"] = added + changed + removed
+        
+        return changes
+    
+    def _dedup_sync_chunks(self, processor, current_files: Dict[str, str], new_files: List[str],
+                           status_callback=None) -> Tuple[List[RuleChunk], List[str]]:
+        """Deduplicate the whole current corpus and return the chunks of every file to re-index.
+        
+        Files already indexed go first, so their canonical chunks keep winning over copies in new
+        files. Besides the new files, a file is re-indexed when its canonical chunks or their
+        duplicate sources differ from what is indexed, e.g. because the copy a chunk had merged
+        into was removed, or a new file duplicates one of its chunks.
+        """
+        kept_files = sorted(name for name in current_files if name in self.indexed_files and name not in new_files)
+        chunks = processor.process_pdfs(kept_files + sorted(new_files), status_callback=status_callback)
+        state = self._chunk_state([self._chunk_to_document(chunk) for chunk in chunks])
+        
+        reindexed = set(new_files) | {
+            name for name in kept_files if state.get(name, {}) != self.indexed_chunks.get(name, {})
+        }
+        if reindexed - set(new_files):
+            print(f"Re-indexing {len(reindexed - set(new_files))} unchanged files whose duplicate chunks changed")
+        return [chunk for chunk in chunks if (chunk.metadata or {}).get("source_file") in reindexed], sorted(reindexed)
+    
+    def _filter_dict(self, federation_filter: FilterValue = None, category_filter: FilterValue = None,
+                     belt_level_filter: FilterValue = None, technique_filter: FilterValue = None) -> Optional[Dict[str, Any]]:
+        """Build a metadata filter; a list of values for one field matches any of them."""
+        filter_dict = {}
+        
+        federations = [value for value in filter_values(federation_filter or []) if value.lower() != "all"]
+        if federations:
+            filter_dict["federation"] = federations
+        
+        for field, value in (("category", category_filter), ("belt_level", belt_level_filter),
+                             ("technique", technique_filter)):
+            values = filter_values(value or [])
+            if values:
+                filter_dict[field] = values
+        
+        return filter_dict if filter_dict else None
+    
+    def _format_result(self, doc: Document, score: float) -> dict:
+        return {
+            "content": doc.page_content,
+            "federation": doc.metadata.get("federation"),
+            "category": doc.metadata.get("category"),
+            "belt_level": doc.metadata.get("belt_level"),
+            "technique": doc.metadata.get("technique"),
+            "score": score,
+            "metadata": doc.metadata
+        }
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries, reusing recent vectors from the query cache."""
+        if len(queries) == 1:
+            embed_missing = lambda missing: [self.embeddings.embed_query(missing[0])]
+        else:
+            embed_missing = self.embeddings.embed_documents
+        if self.query_cache is None:
+            return embed_missing(list(queries))
+        return self.query_cache.embed(list(queries), embed_missing)
+    
+    @staticmethod
+    def _fuse(result_lists: List[List[tuple]], limit: int) -> List[tuple]:
+        # A chunk found by both retrievers is counted once with both ranks
+        fused = reciprocal_rank_fusion(result_lists, key=lambda result: result[0].metadata.get("chunk_id") or result[0].page_content)
+        return [(doc, score) for (doc, _), score in fused[:limit]]
+    
+    def _search(self, queries: List[str], filter_dict: Optional[Dict[str, Any]], limit: int, mode: str):
+        if mode == "fast":
+            return self.lexical_index.search(queries, filter_dict, limit)
+        if mode == "dense":
+            return self.backend.search(self.embed_queries(queries), filter_dict, limit)
+        if mode == "hybrid":
+            dense = self.backend.search(self.embed_queries(queries), filter_dict, limit)
+            lexical = self.lexical_index.search(queries, filter_dict, limit)
+            return [self._fuse([d, l], limit) for d, l in zip(dense, lexical)]
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    
+    def search_similar(self, query: str, federation_filter: FilterValue = None, category_filter: FilterValue = None, 
+                      belt_level_filter: FilterValue = None, limit: int = 10,
+                      technique_filter: FilterValue = None, mode: str = RETRIEVAL_MODE) -> List[dict]:
+        if not self.ready:
+            print("Error: Vectorstore not initialized")
+            return []
+        
+        try:
+            results = self._search(
+                [query],
+                self._filter_dict(federation_filter, category_filter, belt_level_filter, technique_filter),
+                limit,
+                mode
+            )[0]
             
-            return formatted_results
+            return [self._format_result(doc, score) for doc, score in results]
         except Exception as e:
             print(f"Error: Search failed: {e}")
             return []
+    
+    def search_many(self, queries: List[str], federation_filter: FilterValue = None, category_filter: FilterValue = None,
+                    belt_level_filter: FilterValue = None, limit: int = 10,
+                    technique_filter: FilterValue = None, mode: str = RETRIEVAL_MODE) -> List[List[dict]]:
+        """Search several queries with one embedding call and one batched backend search.
+        
+        mode "fast" answers from the local BM25 index alone, with no embedding call;
+        "hybrid" fuses BM25 and dense results by reciprocal rank.
+        """
+        if not self.ready:
+            print("Error: Vectorstore not initialized")
+            return [[] for _ in queries]
+        
+        if not queries:
+            return []
+        
+        try:
+            results = self._search(
+                list(queries),
+                self._filter_dict(federation_filter, category_filter, belt_level_filter, technique_filter),
+                limit,
+                mode
+            )
+            
+            return [[self._format_result(doc, score) for doc, score in query_results] for query_results in results]
+        except Exception as e:
+            print(f"Error: Batched search failed: {e}")
+            return [[] for _ in queries]
@@ -0,0 +1,92 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Tuple
+from config import EMBEDDING_MODEL, QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS
+
+class QueryEmbeddingCache:
+    """In-process LRU cache of query vectors with a time-to-live.
+
+    Entries are keyed on the embedding model and the normalised query text, so repeats that
+    differ only in case or spacing share one vector. The least recently used entry is evicted
+    once the cache is full, and entries older than the TTL are embedded again.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL, max_entries: int = QUERY_CACHE_SIZE,
+                 ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def normalise(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip().casefold()
+
+    def _lookup(self, key: Tuple[str, str], now: float):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, vector = entry
+        if self.ttl_seconds and now - stored_at > self.ttl_seconds:
+            del self.entries[key]
+            self.expired += 1
+            return None
+        self.entries.move_to_end(key)
+        return vector
+
+    def _store(self, key: Tuple[str, str], vector: List[float], now: float):
+        self.entries[key] = (now, vector)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def embed(self, queries: List[str], embed_missing: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Return one vector per query, embedding only the queries that are not cached."""
+        keys = [(self.model, self.normalise(query)) for query in queries]
+        now = time.monotonic()
+        with self.lock:
+            vectors = {key: self._lookup(key, now) for key in dict.fromkeys(keys)}
+        missing = {key: query for key, query in zip(keys, queries) if vectors[key] is None}
+
+        # The API call runs outside the lock so concurrent requests are not serialised
+        if missing:
+            for key, vector in zip(missing, embed_missing(list(missing.values()))):
+                vectors[key] = vector
+
+        with self.lock:
+            now = time.monotonic()
+            for key in missing:
+                self._store(key, vectors[key], now)
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        return [vectors[key] for key in keys]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "entries": len(self.entries)
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Query embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate), {stats['expired']} expired, "
+              f"{stats['evicted']} evicted, {stats['entries']} entries")
@@ -0,0 +1,29 @@
+from typing import List, Callable, Hashable, Optional, Sequence, Tuple, TypeVar
+from config import RRF_K
+
+T = TypeVar("T")
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[T]], key: Callable[[T], Hashable],
+                           k: int = RRF_K, weights: Optional[Sequence[float]] = None) -> List[Tuple[T, float]]:
+    """Fuse ranked lists into one, scoring each item by sum(weight / (k + rank)) over the lists.
+
+    Items are identified by `key`, so the same chunk found by several queries is merged into
+    one entry (kept as first seen) before any truncation happens. Raw scores are ignored
+    because they are not comparable across queries or retrievers.
+    """
+    scores = {}
+    items = {}
+    for index, ranked in enumerate(ranked_lists):
+        weight = weights[index] if weights else 1.0
+        seen = set()
+        for rank, item in enumerate(ranked, 1):
+            item_key = key(item)
+            # A list votes for each item once, at its best rank
+            if item_key in seen:
+                continue
+            seen.add(item_key)
+            items.setdefault(item_key, item)
+            scores[item_key] = scores.get(item_key, 0.0) + weight / (k + rank)
+
+    ranked_keys = sorted(scores, key=lambda item_key: scores[item_key], reverse=True)
+    return [(items[item_key], scores[item_key]) for item_key in ranked_keys]
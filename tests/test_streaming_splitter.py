@@ -0,0 +1,54 @@
+import random
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.extraction.streaming_splitter import StreamingTextSplitter
+from src.extraction.processing_strategy import CHUNK_SEPARATORS
+
+WORDS = ["guard", "pass", "heel", "hook", "points", "a", "the", "referee", "ADCC", "IBJJF", "knee", "reaping"]
+
+def random_document(rng: random.Random) -> str:
+    # Paragraphs of every shape the splitter recurses into: long runs of words, sentences and lines
+    parts = []
+    for _ in range(rng.randint(1, 60)):
+        kind = rng.random()
+        if kind < 0.5:
+            parts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 300))))
+        elif kind < 0.7:
+            parts.append(". ".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 20))) for _ in range(rng.randint(1, 40))
+            ))
+        else:
+            parts.append("\n".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30))) for _ in range(rng.randint(1, 30))
+            ))
+        parts.append(rng.choice(["\n\n", "\n", "\n\n\n", " \n\n "]))
+    return "".join(parts)
+
+def random_segments(rng: random.Random, document: str):
+    cuts = rng.choice([0, 1, 5, 50, 300])
+    cuts = sorted(rng.sample(range(1, len(document)), min(len(document) - 1, cuts))) if len(document) > 1 else []
+    return [document[start:end] for start, end in zip([0] + cuts, cuts + [len(document)])]
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(800, 160), (300, 60), (120, 0), (200, 150)])
+def test_streaming_split_matches_create_documents(chunk_size, chunk_overlap):
+    rng = random.Random(chunk_size * 1000 + chunk_overlap)
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=CHUNK_SEPARATORS, add_start_index=True
+    )
+    splitter = StreamingTextSplitter(chunk_size, chunk_overlap, CHUNK_SEPARATORS)
+
+    for _ in range(250):
+        document = random_document(rng)
+        expected = [(doc.metadata["start_index"], doc.page_content) for doc in reference.create_documents([document])]
+        assert list(splitter.split_segments(random_segments(rng, document))) == expected
+
+def test_document_without_paragraph_breaks_is_split_whole():
+    document = "no paragraph breaks here. " * 200
+    reference = RecursiveCharacterTextSplitter(
+        chunk_size=800, chunk_overlap=160, separators=CHUNK_SEPARATORS, add_start_index=True
+    )
+    expected = [(doc.metadata["start_index"], doc.page_content) for doc in reference.create_documents([document])]
+    segments = [document[i:i + 97] for i in range(0, len(document), 97)]
+    assert list(StreamingTextSplitter(800, 160, CHUNK_SEPARATORS).split_segments(segments)) == expected